@@ -0,0 +1,6 @@
+from . import urls
+from .async_views import async_read_view
+
+app_name = urls.app_name
+
+urlpatterns = urls.get_urlpatterns(async_read_view)
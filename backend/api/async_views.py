@@ -0,0 +1,43 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+def run_view_in_thread(view, request, *args, **kwargs):
+    """Выполняет представление и рендерит ответ в потоке из пула.
+
+    У каждого потока своё соединение с базой, поэтому устаревшие
+    соединения закрываются здесь, а не сигналами обработчика запросов.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка для представлений с тяжёлыми GET-запросами.
+
+    Под ASGI Django 3.2 выполняет синхронные представления в одном общем
+    потоке, по очереди. Обёртка отдаёт безопасные запросы в пул потоков:
+    аутентификация, ORM и сериализация идут параллельно, а ожидание
+    медленных клиентов остаётся на цикле событий и не занимает воркер.
+    Изменяющие запросы выполняются как раньше. Обёртки подключаются
+    только в маршрутах для ASGI (api/asgi_urls.py).
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await sync_to_async(
+                run_view_in_thread, thread_sensitive=False,
+            )(view, request, *args, **kwargs)
+        return await sync_to_async(view, thread_sensitive=True)(
+            request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,44 @@
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from food.versions import get_versions, user_scope
+
+
+def conditional_get(*scopes, per_user=False):
+    """Отвечает 304 на GET, если данные в `scopes` не менялись.
+
+    ETag собирается из версий моделей; при `per_user` к нему добавляется
+    версия данных пользователя (избранное, покупки, подписки).
+    Область может быть функцией от запроса и аргументов URL, которая
+    возвращает имя области или None.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            all_scopes = [
+                scope(request, **kwargs) if callable(scope) else scope
+                for scope in scopes]
+            all_scopes = [scope for scope in all_scopes if scope]
+            user = request.user
+            if per_user and user.is_authenticated:
+                all_scopes.append(user_scope(user.id))
+            versions = get_versions(*all_scopes)
+            tags = [token for token, _ in versions]
+            if per_user:
+                tags.append(str(user.id) if user.is_authenticated else 'anon')
+            etag = quote_etag('-'.join(tags))
+            last_modified = max(modified for _, modified in versions)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            if per_user:
+                patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+import csv
+import json
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_cart_txt(ingredients):
+    yield 'Cписок покупок:\n'
+    for ingredient in ingredients:
+        yield '{} - {} {}.\n'.format(*ingredient)
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for ingredient in ingredients:
+        yield writer.writerow(ingredient)
+
+
+def shopping_cart_json(ingredients):
+    yield '['
+    for number, (name, amount, unit) in enumerate(ingredients):
+        yield (',' if number else '') + json.dumps(
+            {'name': name, 'amount': amount, 'measurement_unit': unit},
+            ensure_ascii=False)
+    yield ']'
+
+
+SHOPPING_CART_EXPORTERS = {
+    'txt': shopping_cart_txt,
+    'csv': shopping_cart_csv,
+    'json': shopping_cart_json,
+}
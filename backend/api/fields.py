@@ -0,0 +1,42 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from food.cache import get_tags_by_id
+from food.images import derivative_names
+
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии картинки рецепта по размерам и форматам."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = 'image'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for size, formats in derivative_names(value.name).items():
+            urls[size] = {}
+            for file_format, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[size][file_format] = url
+        return urls
+
+
+class CachedTagField(serializers.PrimaryKeyRelatedField):
+    """Проверяет id тэга по кэшу справочника и возвращает сам id."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in get_tags_by_id():
+            self.fail('does_not_exist', pk_value=data)
+        return pk
@@ -1,35 +1,55 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from food.models import Recipe, Tag
+from food.cache import get_tag_ids_by_slug
+from food.models import Favorite, Recipe, ShoppingCart
+from food.search import search_recipes
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
 
 
 class RecipeFilter(filters.FilterSet):
-    author = filters.AllValuesFilter(field_name='author')
-    tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                             to_field_name='slug',
-                                             queryset=Tag.objects.all())
+    """Фильтры рецептов на полусоединениях (EXISTS) без DISTINCT.
+
+    Рецепт попадает в выборку не больше одного раза при любом наборе
+    фильтров, а слаги тэгов переводятся в id по кэшу справочника.
+    """
+    author = filters.NumberFilter(field_name='author_id')
+    tags = filters.MultipleChoiceFilter(choices=tag_choices,
+                                        method='filter_tags')
     is_favorited = filters.BooleanFilter(
         field_name="is_favorited",
         method='is_favorite_filter')
     is_in_shopping_cart = filters.BooleanFilter(
         field_name="is_in_shopping_cart",
         method='is_in_shopping_cart_filter')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'author', 'tags', 'is_in_shopping_cart']
+        fields = ['is_favorited', 'author', 'tags', 'is_in_shopping_cart',
+                  'search']
 
-    def filter_tags(self, queryset, slug, tags):
-        return queryset.filter(tags__slug__contains=tags.split(','))
+    def filter_tags(self, queryset, name, value):
+        ids = get_tag_ids_by_slug()
+        tag_ids = [ids[slug] for slug in value if slug in ids]
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=tag_ids)))
 
-    def is_favorite_filter(self, queryset, name, value):
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_by_user(self, queryset, model, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favorite__user=user)
+            return queryset.filter(Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
+    def is_favorite_filter(self, queryset, name, value):
+        return self.filter_by_user(queryset, Favorite, value)
+
     def is_in_shopping_cart_filter(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(shoppingcart__user=user)
-        return queryset
+        return self.filter_by_user(queryset, ShoppingCart, value)
@@ -1,9 +1,20 @@
-from rest_framework.pagination import (LimitOffsetPagination,
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from rest_framework.pagination import (CursorPagination, LimitOffsetPagination,
                                        PageNumberPagination)
 
+from food.versions import get_versions, user_scope
 from foodgram_backend import constants as c
 from user.models import User
 
+RECIPE_COUNT_KEY = 'recipe_count:{}'
+
 
 class SubscribePagination(LimitOffsetPagination):
     limit_query_param = 'recipes'
@@ -15,3 +26,95 @@ class SubscribePagination(LimitOffsetPagination):
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = c.FoodContant.PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    page_size = c.FoodContant.PAGE_SIZE
+
+
+class FeedPagination(RecipeCursorPagination):
+    """Курсор по id рецепта в ленте: страница — проход по индексу."""
+    ordering = '-recipe_id'
+
+
+class CountedPaginator(Paginator):
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class RecipePagination(CustomPagination):
+    """Постраничный вывод рецептов, с `?cursor=` — по курсору.
+
+    Курсор ищет по `id < последний id` без OFFSET и COUNT(*), поэтому
+    дальние страницы бесконечной ленты не становятся медленнее.
+    Общее число рецептов кэшируется по набору фильтров, а на PostgreSQL
+    для больших выборок берётся оценка планировщика (`count_exact`).
+    """
+    cursor_query_param = 'cursor'
+    user_filter_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def get_count_key(self, request):
+        params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+            if key not in (self.page_query_param,
+                           self.page_size_query_param,
+                           self.cursor_query_param))
+        scopes = ['recipe']
+        user = request.user
+        if user.is_authenticated and any(
+                key in self.user_filter_params for key, _ in params):
+            scopes.append(user_scope(user.id))
+        tokens = [token for token, _ in get_versions(*scopes)]
+        digest = hashlib.md5(
+            json.dumps([tokens, params]).encode()).hexdigest()
+        return RECIPE_COUNT_KEY.format(digest)
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_count(self, queryset):
+        key = self.get_count_key(self.request)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        count = self.estimate_count(queryset)
+        exact = (count is None
+                 or count < settings.RECIPE_COUNT_ESTIMATE_THRESHOLD)
+        if exact:
+            count = queryset.order_by().count()
+        cache.set(key, (count, exact), settings.RECIPE_COUNT_CACHE_TIMEOUT)
+        return count, exact
+
+    def django_paginator_class(self, queryset, page_size):
+        count, self.count_exact = self.get_count(queryset)
+        return CountedPaginator(queryset, page_size, count)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.count_exact
+        return response
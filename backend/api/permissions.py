@@ -7,4 +7,5 @@ class RecipePermission(BasePermission):
                 or request.user.is_authenticated)
 
     def has_object_permission(self, request, view, obj):
-        return request.method in SAFE_METHODS or obj.author == request.user
+        return (request.method in SAFE_METHODS
+                or obj.author_id == request.user.id)
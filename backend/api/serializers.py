@@ -1,12 +1,20 @@
+from django.db import transaction
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
-from food.models import (AmountIngredient, Favorite, Ingredient, Recipe,
-                         ShoppingCart, Tag)
+from food.cache import get_tag_ids_by_slug, invalidate_recipe_shopping_carts
+from food.images import save_recipe_image
+from food.models import AmountIngredient, Ingredient, Recipe, ShoppingCart, Tag
+from food.pantry import PANTRY_SCOPE
+from food.search import ingredient_index
+from food.similar import refresh as refresh_similar
+from food.versions import bump_versions
 from foodgram_backend import constants as c
 from user.models import Subscribe, User
 from user.serializers import UserReadSerializer
 
+from .fields import CachedTagField, ImageDerivativesField
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,33 +52,36 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     author = UserReadSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
         many=True, read_only=True, source='recipe')
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    images = ImageDerivativesField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector', 'favorites_count', 'in_carts_count')
 
-    def get_is_favorited(self, obj):
-        return (
-            self.context.get('request').user.is_authenticated
-            and Favorite.objects.filter(user=self.context['request'].user,
-                                        recipe=obj).exists()
-        )
+    def to_representation(self, instance):
+        instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
 
-    def get_is_in_shopping_cart(self, obj):
-        return (
-            self.context.get('request').user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=self.context['request'].user,
-                recipe=obj).exists()
-        )
+
+class PantryRecipeSerializer(RecipeReadSerializer):
+    missing = serializers.IntegerField(read_only=True)
 
 
 class BaseRecipeSerializer(serializers.ModelSerializer):
+    images = ImageDerivativesField()
+
     class Meta:
         model = Recipe
-        fields = ("id", 'name', "cooking_time", "image")
+        fields = ("id", 'name', "cooking_time", "image", "images")
+
+
+class SimilarRecipeSerializer(BaseRecipeSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(BaseRecipeSerializer.Meta):
+        fields = BaseRecipeSerializer.Meta.fields + ('score',)
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
@@ -88,8 +99,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
 
 
 class RecipeChangeSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(many=True,
-                                              queryset=Tag.objects.all())
+    tags = CachedTagField(many=True, queryset=Tag.objects.all())
     author = UserReadSerializer(read_only=True)
     id = serializers.ReadOnlyField()
     ingredients = RecipeIngredientCreateSerializer(many=True)
@@ -124,32 +134,34 @@ class RecipeChangeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {'error': 'Нельзя создать рецепт без ингредиентов.'}
             )
-        for item in value:
-            if not Ingredient.objects.filter(id=item['id']).exists():
-                raise serializers.ValidationError(
-                    {'error': 'Нет таких ингредиентов в базе данных.'}
-                )
         id_list = [i['id'] for i in value]
         if len(id_list) != len(set(id_list)):
             raise serializers.ValidationError(
                 {'error': 'Ингредиенты не должны повторяться.'})
-
+        if not all(map(ingredient_index.get, id_list)):
+            raise serializers.ValidationError(
+                {'error': 'Нет таких ингредиентов в базе данных.'}
+            )
         return value
 
     def to_representation(self, instance):
         request = self.context.get('request')
+        instance = (Recipe.objects.with_related()
+                    .with_user_flags(request.user).get(pk=instance.pk))
         serializer = RecipeReadSerializer(
             instance, context={'request': request})
         return serializer.data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
+        validated_data['image'] = save_recipe_image(validated_data['image'])
         recipe = Recipe.objects.create(**validated_data)
         AmountIngredient.objects.bulk_create(
             [
                 AmountIngredient(
-                    ingredient=Ingredient.objects.get(id=ingredient['id']),
+                    ingredient_id=ingredient['id'],
                     recipe=recipe,
                     amount=ingredient['amount']
                 )
@@ -157,36 +169,60 @@ class RecipeChangeSerializer(serializers.ModelSerializer):
             ]
         )
         recipe.tags.set(tags)
+        transaction.on_commit(lambda: refresh_similar(recipe.id))
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        """Применяет к рецепту только изменившиеся ингредиенты."""
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        current = {
+            row.ingredient_id: row
+            for row in AmountIngredient.objects.filter(recipe=instance)}
+        deleted = current.keys() - amounts.keys()
+        changed = []
+        for ingredient_id, row in current.items():
+            if (ingredient_id in amounts
+                    and row.amount != amounts[ingredient_id]):
+                row.amount = amounts[ingredient_id]
+                changed.append(row)
+        created = [
+            AmountIngredient(recipe=instance, ingredient_id=ingredient_id,
+                             amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current]
+        if deleted:
+            AmountIngredient.objects.filter(
+                recipe=instance, ingredient_id__in=deleted).delete()
+        if changed:
+            AmountIngredient.objects.bulk_update(changed, ['amount'])
+        if created:
+            AmountIngredient.objects.bulk_create(created)
+        return bool(deleted or changed or created)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = (validated_data.get('name', instance.name))
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time)
         try:
             tags = validated_data.pop('tags')
-        except BaseException:
+        except KeyError:
             raise serializers.ValidationError(
                 {'error': 'Добавьте хотя бы один тэг.'})
-        instance.tags.set(tags)
         try:
             ingredients = validated_data.pop('ingredients')
-        except BaseException:
+        except KeyError:
             raise serializers.ValidationError(
                 {'error': 'Добавьте хотя бы один ингредиент.'})
-        AmountIngredient.objects.filter(recipe=instance).delete()
-        AmountIngredient.objects.bulk_create(
-            [
-                AmountIngredient(
-                    ingredient=Ingredient.objects.get(id=ingredient['id']),
-                    recipe=instance,
-                    amount=ingredient['amount']
-                )
-                for ingredient in ingredients
-            ]
-        )
+        if 'image' in validated_data:
+            instance.image = save_recipe_image(validated_data['image'])
+        instance.name = (validated_data.get('name', instance.name))
+        instance.text = validated_data.get('text', instance.text)
+        instance.cooking_time = validated_data.get(
+            'cooking_time', instance.cooking_time)
+        instance.tags.set(tags)
+        if self.update_ingredients(instance, ingredients):
+            transaction.on_commit(
+                lambda: invalidate_recipe_shopping_carts(instance.id))
+            transaction.on_commit(lambda: refresh_similar(instance.id))
+            transaction.on_commit(lambda: bump_versions(PANTRY_SCOPE))
         instance.save()
         return instance
 
@@ -194,7 +230,6 @@ class RecipeChangeSerializer(serializers.ModelSerializer):
 class SubscribeSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -209,25 +244,15 @@ class SubscribeSerializer(serializers.ModelSerializer):
             "recipes_count")
 
     def get_recipes(self, obj):
-        recipes_max = Recipe.objects.filter(author=obj).count()
-        if self.context:
-            filter_value = self.context['request'].query_params.get(
-                'recipes_limit', recipes_max)
-            queryset = Recipe.objects.filter(author=obj)[:int(filter_value)]
+        if hasattr(obj, 'latest_recipes'):
+            queryset = obj.latest_recipes
         else:
-            queryset = Recipe.objects.filter(author=obj)
+            queryset = obj.recipes.order_by('-id')
         recipes = BaseRecipeSerializer(queryset, many=True)
         return recipes.data
 
     def get_is_subscribed(self, obj):
-        request = self.context['request']
-        if request and not request.user.is_anonymous:
-            return Subscribe.objects.filter(user=request.user,
-                                            author=obj).exists()
-        return False
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return True
 
 
 class BaseSubscribeSerializer(serializers.ModelSerializer):
@@ -264,6 +289,36 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = ('favorite', 'user')
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=c.FoodContant.MAX_BATCH_RECIPES)
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class PantrySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по продуктам в наличии."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=c.FoodContant.MAX_PANTRY_INGREDIENTS)
+    tags = serializers.ListField(
+        child=serializers.CharField(), required=False)
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_tags(self, value):
+        """Слаги тэгов переводятся в id по кэшу справочника."""
+        ids = get_tag_ids_by_slug()
+        unknown = [slug for slug in value if slug not in ids]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Неизвестные тэги: {", ".join(unknown)}.')
+        return [ids[slug] for slug in value] or None
+
+
 class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
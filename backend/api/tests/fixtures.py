@@ -0,0 +1,29 @@
+"""Общие тэги, ингредиенты и рецепты для тестов API."""
+from food.models import AmountIngredient, Ingredient, Recipe, Tag
+
+TAG_NAMES = ('Завтрак', 'Обед', 'Ужин')
+RECIPE_IMAGE = 'recipes/recipe.png'
+
+
+def make_tags():
+    return [Tag.objects.create(name=name, color='#E26C2D')
+            for name in TAG_NAMES]
+
+
+def make_ingredients(count):
+    return [
+        Ingredient.objects.create(
+            name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(count)]
+
+
+def make_recipe(author, name, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Текст', cooking_time=5,
+        image=RECIPE_IMAGE)
+    if tags:
+        recipe.tags.set(tags)
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients)
+    return recipe
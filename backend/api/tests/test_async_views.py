@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from foodgram_backend.asgi import ASGI_URLCONF, application
+from foodgram_backend.replicas import ReplicaMiddleware, use_replica
+from foodgram_backend.timing import ServerTimingMiddleware
+
+PATHS = ('/api/tags/', '/api/recipes/', '/api/recipes/1/',
+         '/api/users/subscriptions/')
+
+
+class AsyncRoutesTest(SimpleTestCase):
+    def test_wsgi_routes_stay_synchronous(self):
+        for path in PATHS:
+            with self.subTest(path=path):
+                self.assertFalse(
+                    asyncio.iscoroutinefunction(resolve(path).func))
+
+    def test_asgi_routes_are_wrapped(self):
+        for path in PATHS:
+            with self.subTest(path=path):
+                match = resolve(path, urlconf=ASGI_URLCONF)
+                self.assertTrue(asyncio.iscoroutinefunction(match.func))
+                self.assertEqual(match.url_name, resolve(path).url_name)
+        self.assertFalse(asyncio.iscoroutinefunction(
+            resolve('/api/users/1/subscribe/', urlconf=ASGI_URLCONF).func))
+
+    def test_asgi_requests_use_asgi_urlconf(self):
+        request, error_response = application.create_request(
+            {'type': 'http', 'method': 'GET', 'path': '/api/tags/',
+             'query_string': b'', 'headers': []},
+            io.BytesIO())
+        self.assertIsNone(error_response)
+        self.assertEqual(request.urlconf, ASGI_URLCONF)
+
+
+class AsyncMiddlewareTest(SimpleTestCase):
+    """Под ASGI свои middleware не уходят в общий синхронный поток."""
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    async def get_response(request):
+        return HttpResponse(str(use_replica.get()))
+
+    def call(self, middleware, method='get'):
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        request = getattr(RequestFactory(), method)('/api/tags/')
+        return asyncio.run(middleware(request))
+
+    def test_replica_middleware_needs_replicas(self):
+        self.assertNotIn(
+            'foodgram_backend.replicas.ReplicaMiddleware',
+            settings.MIDDLEWARE)
+
+    def test_replica_middleware(self):
+        middleware = ReplicaMiddleware(self.get_response)
+        self.assertEqual(self.call(middleware).content, b'True')
+        self.assertEqual(self.call(middleware, 'post').content, b'False')
+        self.assertEqual(self.call(middleware).content, b'False')
+
+    @override_settings(SERVER_TIMING=True)
+    def test_timing_middleware(self):
+        with self.assertLogs('foodgram.timing'):
+            response = self.call(ServerTimingMiddleware(self.get_response))
+        self.assertIn('total;dur=', response['Server-Timing'])
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache_key
+from user.models import User
+
+PASSWORD = 'Pass-word-42'
+
+
+class CachedTokenTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password=PASSWORD,
+            first_name='Имя', last_name='Фамилия')
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self):
+        return self.client.get('/api/users/me/')
+
+    def test_cache_keeps_only_user_id(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(cache.get(token_cache_key(self.token.key)),
+                         self.user.id)
+        response = self.me()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['username'], response.data['first_name']),
+            ('reader', 'Имя'))
+
+    def test_login_does_not_reset_tokens(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                '/api/auth/token/login/',
+                {'email': self.user.email, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+        # Только UPDATE, без поиска токенов пользователя.
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+    def test_password_change_resets_tokens(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/users/set_password/',
+                {'current_password': PASSWORD, 'new_password': 'New-pass-43'})
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+
+    def test_blocked_user_loses_access(self):
+        self.me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.me().status_code, 401)
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import AmountIngredient, Favorite, Ingredient, Recipe, Tag
+from user.models import User
+
+PASSWORD = 'Pass-word-42'
+
+
+class RecipeETagTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create_user(
+                username=username, email=f'{username}@foodgram.ru',
+                password=PASSWORD, first_name='Имя', last_name='Фамилия')
+            for username in ('author', 'reader')]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Каша', text='Варить', cooking_time=10,
+            image='recipes/porridge.png')
+        cls.amount = AmountIngredient.objects.create(
+            recipe=cls.recipe, amount=100,
+            ingredient=Ingredient.objects.create(
+                name='крупа', measurement_unit='г'))
+        cls.tag = Tag.objects.create(name='Завтрак', color='#E26C2D')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.path = f'/api/recipes/{self.recipe.id}/'
+
+    def get(self, etag):
+        return self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+
+    def test_login_keeps_etag(self):
+        etag = self.client.get(self.path)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/auth/token/login/',
+                {'email': self.reader.email, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_only_author_changes_reset_etag(self):
+        etag = self.client.get(self.path)['ETag']
+        self.reader.first_name = 'Другое'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.save()
+        self.assertEqual(self.get(etag).status_code, 304)
+        self.author.first_name = 'Другое'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['author']['first_name'], 'Другое')
+
+    def test_other_users_favorites_do_not_change_response(self):
+        response = self.client.get(self.path)
+        self.assertNotIn('favorites_count', response.data)
+        self.assertNotIn('in_carts_count', response.data)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+        cache.clear()
+        self.assertEqual(self.client.get(self.path).data, response.data)
+
+    def test_ingredient_amount_changes_reset_etag(self):
+        etag = self.client.get(self.path)['ETag']
+        self.amount.amount = 200
+        with self.captureOnCommitCallbacks(execute=True):
+            self.amount.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ingredients'][0]['amount'], 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.amount.delete()
+        response = self.get(response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ingredients'], [])
+
+    def test_tag_changes_reset_etag(self):
+        etag = self.client.get(self.path)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.tags.add(self.tag)
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag['id'] for tag in response.data['tags']],
+                         [self.tag.id])
+
+    def test_unknown_recipe(self):
+        self.assertEqual(
+            self.client.get('/api/recipes/0/').status_code, 404)
+        self.assertEqual(
+            self.client.get('/api/recipes/abc/').status_code, 404)
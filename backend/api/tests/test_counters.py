@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from food.batch import add_recipes, remove_recipes
+from food.counters import deleting
+from food.models import Favorite, Recipe, ShoppingCart
+from user.models import User
+
+
+class CascadeCountersTest(TestCase):
+    def make_user(self, username):
+        return User.objects.create(
+            username=username, email=f'{username}@foodgram.ru')
+
+    def make_recipe(self, author):
+        return Recipe.objects.create(
+            author=author, name='Суп', text='Варить', cooking_time=10,
+            image='recipes/recipe.png')
+
+    def mark(self, recipe, count):
+        for number in range(count):
+            user = self.make_user(f'reader{recipe.id}_{number}')
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    def delete_queries(self, instance):
+        with CaptureQueriesContext(connection) as context:
+            instance.delete()
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_recipe_delete_does_not_update_its_own_counters(self):
+        author = self.make_user('author')
+        queries = []
+        for count in (1, 30):
+            recipe = self.make_recipe(author)
+            self.mark(recipe, count)
+            queries.append(self.delete_queries(recipe))
+        self.assertEqual(len(queries[0]), len(queries[1]))
+        self.assertEqual(
+            sum(sql.startswith('UPDATE') for sql in queries[1]), 1)
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, 0)
+        self.assertFalse(deleting)
+
+    def test_user_delete_updates_other_recipes_only(self):
+        author, reader = self.make_user('author'), self.make_user('reader')
+        kept = self.make_recipe(author)
+        own = [self.make_recipe(reader) for _ in range(3)]
+        for recipe in (kept, *own):
+            Favorite.objects.create(user=reader, recipe=recipe)
+            ShoppingCart.objects.create(user=reader, recipe=recipe)
+        Favorite.objects.create(user=author, recipe=kept)
+        queries = self.delete_queries(reader)
+        self.assertEqual(
+            sum(sql.startswith('UPDATE') for sql in queries), 2)
+        kept.refresh_from_db()
+        self.assertEqual((kept.favorites_count, kept.in_carts_count), (1, 0))
+        self.assertFalse(deleting)
+
+    def test_single_marks_still_count(self):
+        recipe = self.make_recipe(self.make_user('author'))
+        self.mark(recipe, 2)
+        Favorite.objects.filter(recipe=recipe).first().delete()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.favorites_count, recipe.in_carts_count),
+                         (1, 2))
+
+
+class BatchCountersTest(TestCase):
+    """Строки, изменённые другим запросом между проверкой и записью."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(
+            username='author', email='author@foodgram.ru')
+        cls.user = User.objects.create(
+            username='reader', email='reader@foodgram.ru')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name='Суп', text='Варить', cooking_time=10,
+                image='recipes/recipe.png')
+            for _ in range(3)]
+        cls.ids = [recipe.id for recipe in cls.recipes]
+        Favorite.objects.create(user=author, recipe=cls.recipes[0])
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+
+    def counts(self):
+        return list(Recipe.objects.filter(id__in=self.ids).order_by('id')
+                    .values_list('favorites_count', flat=True))
+
+    def test_add_counts_inserted_rows_only(self):
+        with mock.patch('food.batch.split_recipes',
+                        return_value=(set(), set(self.ids))):
+            add_recipes(Favorite, self.user, self.ids)
+        self.assertEqual(self.counts(), [2, 1, 1])
+
+    def test_remove_counts_deleted_rows_only(self):
+        with mock.patch('food.batch.split_recipes',
+                        return_value=(set(self.ids), set())):
+            remove_recipes(Favorite, self.user, self.ids)
+        self.assertEqual(self.counts(), [1, 0, 0])
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.feed import rebuild
+from food.models import FeedEntry, Recipe
+from foodgram_backend import constants as c
+from user.models import Subscribe, User
+
+LIMIT = c.FoodContant.FEED_BACKFILL_LIMIT
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other_reader, *cls.authors = [
+            User.objects.create_user(
+                username=username, email=f'{username}@foodgram.ru',
+                password='pass')
+            for username in ('reader', 'other', 'first', 'second', 'third')]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def create_recipes(self, author, count):
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=5, image='recipes/recipe.png')
+            for number in range(count))
+        return list(Recipe.objects.filter(author=author)
+                    .order_by('-id').values_list('id', flat=True))
+
+    def subscribe(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def feed_ids(self, limit=None):
+        params = {} if limit is None else {'limit': limit}
+        ids, url = [], '/api/recipes/feed/'
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url, params = response.data['next'], {}
+        return ids
+
+    def test_new_recipe_reaches_subscribers(self):
+        author = self.authors[0]
+        self.subscribe(author)
+        Subscribe.objects.create(user=self.other_reader, author=author)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=author, name='Новый', text='Текст', cooking_time=5,
+                image='recipes/recipe.png')
+        self.assertEqual(self.feed_ids(), [recipe.id])
+        self.assertEqual(
+            set(FeedEntry.objects.filter(recipe=recipe)
+                .values_list('user_id', flat=True)),
+            {self.reader.id, self.other_reader.id})
+        Recipe.objects.create(
+            author=self.authors[1], name='Чужой', text='Текст',
+            cooking_time=5, image='recipes/recipe.png')
+        self.assertEqual(self.feed_ids(), [recipe.id])
+
+    def test_subscribe_backfills_latest_recipes(self):
+        author = self.authors[0]
+        recipe_ids = self.create_recipes(author, LIMIT + 5)
+        self.assertEqual(self.feed_ids(), [])
+        self.subscribe(author)
+        self.assertEqual(self.feed_ids(), recipe_ids[:LIMIT])
+
+    def test_unsubscribe_prunes_only_that_author(self):
+        first_ids = self.create_recipes(self.authors[0], 3)
+        second_ids = self.create_recipes(self.authors[1], 2)
+        for author in self.authors[:2]:
+            self.subscribe(author)
+        Subscribe.objects.create(
+            user=self.other_reader, author=self.authors[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'/api/users/{self.authors[0].id}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.feed_ids(), second_ids)
+        self.assertEqual(
+            sorted(FeedEntry.objects.filter(user=self.other_reader)
+                   .values_list('recipe_id', flat=True)),
+            sorted(first_ids))
+
+    def test_cursor_pages_follow_recipe_order(self):
+        for author in self.authors:
+            self.subscribe(author)
+        for number in range(4):
+            for author in self.authors:
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {number}', text='Текст',
+                    cooking_time=5, image='recipes/recipe.png')
+        expected = list(Recipe.objects.order_by('-id')
+                        .values_list('id', flat=True))
+        self.assertEqual(len(expected), 4 * len(self.authors))
+        for limit in (1, 5, len(expected)):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.feed_ids(limit), expected)
+
+    def test_rebuild_matches_signals(self):
+        for author, count in zip(self.authors, (LIMIT + 2, 3, 0)):
+            self.create_recipes(author, count)
+            self.subscribe(author)
+        Subscribe.objects.create(
+            user=self.other_reader, author=self.authors[1])
+        entries = set(FeedEntry.objects.values_list(
+            'user_id', 'recipe_id', 'author_id'))
+        rebuild()
+        self.assertEqual(
+            set(FeedEntry.objects.values_list(
+                'user_id', 'recipe_id', 'author_id')),
+            entries)
@@ -0,0 +1,89 @@
+from itertools import product
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import make_recipe, make_tags
+from food.models import Favorite, Recipe, ShoppingCart
+from user.models import User
+
+
+class RecipeFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = make_tags()
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@foodgram.ru',
+                password='pass')
+            for number in range(2)]
+        cls.recipes = [
+            make_recipe(cls.users[number % 2], f'Рецепт {number}',
+                        tags=cls.tags[:number % 3 + 1])
+            for number in range(8)]
+        user = cls.users[0]
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=user, recipe=recipe)
+        for recipe in cls.recipes[::3]:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def expected(self, author, tags, is_favorited, is_in_shopping_cart):
+        user = self.users[0]
+        recipes = Recipe.objects.all()
+        if author:
+            recipes = recipes.filter(author=author)
+        ids = {recipe.id for recipe in recipes}
+        if tags:
+            ids &= set(Recipe.objects.filter(
+                tags__slug__in=tags).values_list('id', flat=True))
+        if is_favorited:
+            ids &= set(Favorite.objects.filter(
+                user=user).values_list('recipe_id', flat=True))
+        if is_in_shopping_cart:
+            ids &= set(ShoppingCart.objects.filter(
+                user=user).values_list('recipe_id', flat=True))
+        return sorted(ids, reverse=True)
+
+    def test_filter_combinations(self):
+        slugs = [tag.slug for tag in self.tags]
+        matrix = product(
+            (None, self.users[1].id),
+            ([], slugs[:1], slugs[1:]),
+            (False, True),
+            (False, True))
+        for author, tags, is_favorited, is_in_shopping_cart in matrix:
+            params = {'limit': 20}
+            if author:
+                params['author'] = author
+            if tags:
+                params['tags'] = tags
+            if is_favorited:
+                params['is_favorited'] = 1
+            if is_in_shopping_cart:
+                params['is_in_shopping_cart'] = 1
+            expected = self.expected(
+                author, tags, is_favorited, is_in_shopping_cart)
+            with self.subTest(**params):
+                cache.clear()
+                self.client.get('/api/tags/')
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get('/api/recipes/', params)
+                ids = [recipe['id'] for recipe in response.json()['results']]
+                self.assertEqual(ids, expected)
+                self.assertEqual(response.json()['count'], len(expected))
+                self.assertEqual(
+                    len(context.captured_queries), 4 if expected else 1)
+                for query in context.captured_queries:
+                    self.assertNotIn('DISTINCT', query['sql'])
+
+    def test_anonymous_user_flags_are_ignored(self):
+        response = APIClient().get(
+            '/api/recipes/', {'is_favorited': 1, 'limit': 20})
+        self.assertEqual(response.json()['count'], len(self.recipes))
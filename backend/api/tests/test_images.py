@@ -0,0 +1,55 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from food.images import derivative_names
+from food.models import Recipe
+from user.models import User
+
+
+class RecipeImageDerivativesTest(TestCase):
+    """Рецепты, сохранённые в обход API, например из админки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+
+    def setUp(self):
+        self.author = User.objects.create(
+            username='author', email='author@foodgram.ru')
+
+    def save_image(self, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1000), 'orange').save(buffer, 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def derivatives(self, name):
+        return [
+            default_storage.exists(path)
+            for formats in derivative_names(name).values()
+            for path in formats.values()]
+
+    def test_saved_recipe_gets_derivatives(self):
+        name = self.save_image('recipes/admin.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                author=self.author, name='Суп', text='Варить',
+                cooking_time=10, image=name)
+        self.assertTrue(all(self.derivatives(name)))
+
+    def test_missing_original_is_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                author=self.author, name='Суп', text='Варить',
+                cooking_time=10, image='recipes/missing.png')
+        self.assertFalse(any(self.derivatives('recipes/missing.png')))
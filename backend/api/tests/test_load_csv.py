@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from food.models import Ingredient
+from food.versions import get_versions
+
+
+class LoadCsvTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = Path(directory) / 'ingredients.csv'
+        self.path.write_text('соль,г\nсахар,г\n', encoding='utf-8')
+
+    def load(self, *args):
+        call_command('load_csv', str(self.path), *args, stdout=StringIO())
+
+    def test_dry_run_does_not_touch_database_or_versions(self):
+        version = get_versions('ingredient')
+        with self.assertNumQueries(0):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.load('--dry-run')
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_versions('ingredient'), version)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_load_bumps_version(self):
+        version = get_versions('ingredient')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load()
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertNotEqual(get_versions('ingredient'), version)
@@ -0,0 +1,140 @@
+from itertools import product
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import make_ingredients, make_recipe, make_tags
+from food.models import AmountIngredient, Recipe
+from food.pantry import pantry_index
+from user.models import User
+
+
+class PantryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = make_tags()
+        cls.ingredients = make_ingredients(8)
+        author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass')
+        cls.recipes = {}
+        for number in range(12):
+            ingredients = cls.ingredients[number % 5:number % 5 + number % 4]
+            recipe = make_recipe(
+                author, f'Рецепт {number}', tags=cls.tags[:number % 3 + 1],
+                ingredients=ingredients)
+            cls.recipes[recipe.id] = (
+                {ingredient.id for ingredient in ingredients},
+                {tag.slug for tag in cls.tags[:number % 3 + 1]})
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def expected(self, pantry, tags, max_missing):
+        matches = []
+        for recipe_id, (ingredients, recipe_tags) in self.recipes.items():
+            missing = len(ingredients - pantry)
+            if (ingredients & pantry
+                    and (not tags or recipe_tags & set(tags))
+                    and (max_missing is None or missing <= max_missing)):
+                matches.append((missing, -recipe_id))
+        return [(-recipe_id, missing) for missing, recipe_id in sorted(
+            matches)]
+
+    def fetch(self, pantry, tags, max_missing):
+        params = {'ingredients': sorted(pantry), 'tags': tags, 'limit': 5}
+        if max_missing is not None:
+            params['max_missing'] = max_missing
+        results, page = [], 1
+        while True:
+            response = self.client.get(
+                '/api/recipes/pantry/', {**params, 'page': page})
+            self.assertEqual(response.status_code, 200, response.data)
+            results.extend(
+                (recipe['id'], recipe['missing'])
+                for recipe in response.data['results'])
+            if not response.data['next']:
+                return results
+            page += 1
+
+    def test_recipes_are_ranked_by_missing_ingredients(self):
+        ids = [ingredient.id for ingredient in self.ingredients]
+        pantries = ({ids[0]}, set(ids[:3]), set(ids[2:6]), set(ids))
+        slugs = [tag.slug for tag in self.tags]
+        for pantry, tags, max_missing in product(
+                pantries, ([], slugs[2:], slugs[1:]), (None, 0, 1)):
+            with self.subTest(pantry=pantry, tags=tags,
+                              max_missing=max_missing):
+                self.assertEqual(self.fetch(pantry, tags, max_missing),
+                                 self.expected(pantry, tags, max_missing))
+
+    def test_recipe_changes_rebuild_index(self):
+        ingredient = self.ingredients[-1]
+        self.assertEqual(self.fetch({ingredient.id}, [], None), [])
+        recipe = Recipe.objects.get(id=min(self.recipes))
+        with self.captureOnCommitCallbacks(execute=True):
+            AmountIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1)
+            recipe.save()
+        self.assertEqual(
+            self.fetch({ingredient.id}, [], None),
+            [(recipe.id, len(self.recipes[recipe.id][0]))])
+
+    def test_recipe_added_during_build(self):
+        ingredient = self.ingredients[-1]
+        added = []
+
+        def add_recipe(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not added and sql.startswith(
+                    'SELECT "food_amountingredient"."recipe_id"'):
+                added.append(None)
+                added[0] = recipe = Recipe.objects.create(
+                    author=Recipe.objects.first().author, name='Новый',
+                    text='Текст', cooking_time=5, image='recipes/recipe.png')
+                recipe.tags.set(self.tags)
+                AmountIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1)
+            return result
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with connection.execute_wrapper(add_recipe):
+                self.assertEqual(self.fetch({ingredient.id}, [], None), [])
+        self.assertEqual(self.fetch({ingredient.id}, [], None),
+                         [(added[0].id, 0)])
+
+    def test_rebuilds_only_on_own_changes(self):
+        self.fetch({self.ingredients[0].id}, [], None)
+        _, index = pantry_index._state
+        recipe = Recipe.objects.get(id=min(self.recipes))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Другое название'
+            recipe.save()
+            self.tags[0].name = 'Полдник'
+            self.tags[0].save()
+            self.ingredients[0].name = 'другое название'
+            self.ingredients[0].save()
+        self.fetch({self.ingredients[0].id}, [], None)
+        self.assertIs(pantry_index._state[1], index)
+        for change in (
+                lambda: recipe.tags.add(self.tags[2]),
+                lambda: AmountIngredient.objects.create(
+                    recipe=recipe, ingredient=self.ingredients[-1],
+                    amount=1)):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.fetch({self.ingredients[0].id}, [], None)
+            self.assertIsNot(pantry_index._state[1], index)
+            _, index = pantry_index._state
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'ingredients': 'соль'},
+                       {'ingredients': self.ingredients[0].id,
+                        'tags': 'unknown'},
+                       {'ingredients': self.ingredients[0].id,
+                        'max_missing': -1}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/pantry/', params)
+                self.assertEqual(response.status_code, 400)
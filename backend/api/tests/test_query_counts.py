@@ -0,0 +1,309 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, URLResolver
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import urls
+from api.tests.fixtures import make_ingredients, make_recipe, make_tags
+from food.models import Favorite, ShoppingCart
+from food.similar import rebuild as rebuild_similar
+from user.models import Subscribe, User
+
+PROJECT_DIR = str(settings.BASE_DIR)
+ORM_DIR = os.path.join('django', 'db', '')
+PASSWORD = 'Pass-word-42'
+# Маршруты djoser для подтверждения почты и сброса пароля или логина
+# фронтендом не используются: письма в проекте не настроены.
+UNMEASURED = {
+    'api-root', 'user-activation', 'user-resend-activation',
+    'user-reset-password', 'user-reset-password-confirm',
+    'user-reset-username', 'user-reset-username-confirm',
+    'user-set-username',
+}
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def short_path(filename):
+    if filename.startswith(PROJECT_DIR):
+        return os.path.relpath(filename, PROJECT_DIR)
+    return filename.rsplit('site-packages' + os.sep, 1)[-1]
+
+
+def call_site():
+    """Место запроса: ближайший кадр из кода проекта (без тестов) и,
+    если запрос выполнила библиотека, её ближайший кадр вне ORM."""
+    stack = traceback.extract_stack()[:-3]
+    caller = project = None
+    for frame in reversed(stack):
+        if caller is None and ORM_DIR not in frame.filename:
+            caller = frame
+        if (frame.filename.startswith(PROJECT_DIR)
+                and os.sep + 'tests' + os.sep not in frame.filename):
+            project = frame
+            break
+    if project is None:
+        return 'вне кода проекта'
+    site = f'{short_path(project.filename)}:{project.lineno} in {project.name}'
+    if caller is not project:
+        site += (f' -> {short_path(caller.filename)}:{caller.lineno}'
+                 f' in {caller.name}')
+    return site
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((call_site(), sql))
+        return execute(sql, params, many, context)
+
+    def by_site(self):
+        sites = defaultdict(list)
+        for site, sql in self.queries:
+            sites[site].append(sql)
+        return sites
+
+
+def report(small, large):
+    """Запросы по местам вызова; сначала места, где их число выросло."""
+    small_sites, large_sites = small.by_site(), large.by_site()
+    lines = []
+    for site, queries in sorted(
+            large_sites.items(),
+            key=lambda item: len(small_sites.get(item[0], ()))
+            - len(item[1])):
+        before = len(small_sites.get(site, ()))
+        lines.append(f'  {site}: {before} -> {len(queries)}')
+        lines.extend(f'      {sql[:300]}' for sql in queries[:3])
+    return '\n'.join(lines)
+
+
+class QueryCountTest(TestCase):
+    """Число запросов не должно расти с размером данных и страницы.
+
+    Каждый маршрут выполняется на маленьком и на большом наборе данных,
+    с маленькой и большой страницей; числа запросов сравниваются.
+    """
+
+    image = make_image()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+
+    def make_dataset(self, scale):
+        data = type('Dataset', (), {})()
+        data.scale = scale
+        data.limit = 2 * scale
+        data.tags = make_tags()
+        data.ingredients = make_ingredients(6 * scale)
+        data.user = User.objects.create_user(
+            username=f'reader{scale}', email=f'reader{scale}@foodgram.ru',
+            password=PASSWORD, first_name='Имя', last_name='Фамилия')
+        data.authors = [
+            User.objects.create_user(
+                username=f'author{scale}_{number}',
+                email=f'author{scale}_{number}@foodgram.ru',
+                password=PASSWORD, first_name='Имя', last_name='Фамилия')
+            for number in range(2 * scale)]
+        data.recipes = []
+        for author in [data.user, *data.authors]:
+            for number in range(2 * scale):
+                data.recipes.append(make_recipe(
+                    author, f'Суп {author.id} {number}',
+                    tags=data.tags[:number % 3 + 1],
+                    ingredients=data.ingredients[:2 * scale]))
+        data.own_recipe = data.recipes[0]
+        data.recipe = data.recipes[-1]
+        others = data.recipes[2 * scale:]
+        for recipe in others[::2]:
+            Favorite.objects.create(user=data.user, recipe=recipe)
+            ShoppingCart.objects.create(user=data.user, recipe=recipe)
+        data.marked, data.unmarked = others[::2], others[1::2]
+        for author in data.authors[1:]:
+            Subscribe.objects.create(user=data.user, author=author)
+        data.subscribed, data.unsubscribed = (
+            data.authors[1], data.authors[0])
+        data.token = Token.objects.create(user=data.user)
+        rebuild_similar()
+        return data
+
+    def recipe_payload(self, data):
+        return {
+            'name': 'Новый рецепт', 'text': 'Текст', 'cooking_time': 5,
+            'image': self.image,
+            'tags': [tag.id for tag in data.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in data.ingredients[-2 * data.scale:]]}
+
+    def routes(self, data):
+        """Имя маршрута, метод, путь, тело и нужен ли токен."""
+        limit = data.limit
+        ids = [recipe.id for recipe in data.unmarked]
+        marked_ids = [recipe.id for recipe in data.marked]
+        return (
+            ('tags-list', 'get', '/api/tags/', None, False),
+            ('tags-detail', 'get', f'/api/tags/{data.tags[0].id}/',
+             None, False),
+            ('ingredients-list', 'get', '/api/ingredients/?name=ингр',
+             None, False),
+            ('ingredients-detail', 'get',
+             f'/api/ingredients/{data.ingredients[0].id}/', None, False),
+            ('recipe-list', 'get', f'/api/recipes/?limit={limit}',
+             None, False),
+            ('recipe-list', 'get', f'/api/recipes/?limit={limit}',
+             None, True),
+            ('recipe-list', 'get',
+             f'/api/recipes/?limit={limit}&is_favorited=1'
+             f'&is_in_shopping_cart=1&tags={data.tags[0].slug}',
+             None, True),
+            ('recipe-list', 'get',
+             f'/api/recipes/?limit={limit}&search=суп', None, True),
+            ('recipe-list', 'get', f'/api/recipes/?limit={limit}&cursor=',
+             None, True),
+            ('recipe-list', 'post', '/api/recipes/',
+             self.recipe_payload(data), True),
+            ('recipe-detail', 'get', f'/api/recipes/{data.recipe.id}/',
+             None, False),
+            ('recipe-detail', 'get', f'/api/recipes/{data.recipe.id}/',
+             None, True),
+            ('recipe-detail', 'patch',
+             f'/api/recipes/{data.own_recipe.id}/',
+             self.recipe_payload(data), True),
+            ('recipe-detail', 'delete',
+             f'/api/recipes/{data.own_recipe.id}/', None, True),
+            ('recipe-favorite', 'post',
+             f'/api/recipes/{data.unmarked[0].id}/favorite/', None, True),
+            ('recipe-favorite', 'delete',
+             f'/api/recipes/{data.marked[0].id}/favorite/', None, True),
+            ('recipe-shopping-cart', 'post',
+             f'/api/recipes/{data.unmarked[0].id}/shopping_cart/',
+             None, True),
+            ('recipe-shopping-cart', 'delete',
+             f'/api/recipes/{data.marked[0].id}/shopping_cart/',
+             None, True),
+            ('recipe-favorite-batch', 'post', '/api/recipes/favorite/batch/',
+             {'recipes': ids}, True),
+            ('recipe-favorite-batch', 'delete',
+             '/api/recipes/favorite/batch/', {'recipes': marked_ids}, True),
+            ('recipe-shopping-cart-batch', 'post',
+             '/api/recipes/shopping_cart/batch/', {'recipes': ids}, True),
+            ('recipe-shopping-cart-batch', 'delete',
+             '/api/recipes/shopping_cart/batch/',
+             {'recipes': marked_ids}, True),
+            ('recipe-feed', 'get', f'/api/recipes/feed/?limit={limit}',
+             None, True),
+            ('recipe-pantry', 'get',
+             f'/api/recipes/pantry/?limit={limit}&tags={data.tags[0].slug}&'
+             + '&'.join(f'ingredients={ingredient.id}'
+                        for ingredient in data.ingredients[:3 * data.scale]),
+             None, True),
+            ('recipe-similar', 'get',
+             f'/api/recipes/{data.recipe.id}/similar/', None, False),
+            ('recipe-download-shopping-cart', 'get',
+             '/api/recipes/download_shopping_cart/', None, True),
+            ('user-list', 'get', f'/api/users/?limit={limit}', None, False),
+            ('user-list', 'get', f'/api/users/?limit={limit}', None, True),
+            ('user-list', 'post', '/api/users/',
+             {'email': 'new@foodgram.ru', 'username': 'new',
+              'first_name': 'Имя', 'last_name': 'Фамилия',
+              'password': PASSWORD}, False),
+            ('user-detail', 'get', f'/api/users/{data.authors[0].id}/',
+             None, True),
+            ('user-me', 'get', '/api/users/me/', None, True),
+            ('user-set-password', 'post', '/api/users/set_password/',
+             {'current_password': PASSWORD,
+              'new_password': 'Other-pass-42'}, True),
+            ('subscriptions', 'get',
+             f'/api/users/subscriptions/?limit={limit}'
+             f'&recipes_limit={limit}', None, True),
+            ('subscriptions', 'get',
+             f'/api/users/subscriptions/?limit={limit}', None, True),
+            ('subscribe', 'post',
+             f'/api/users/{data.unsubscribed.id}/subscribe/', None, True),
+            ('subscribe', 'delete',
+             f'/api/users/{data.subscribed.id}/subscribe/', None, True),
+            ('login', 'post', '/api/auth/token/login/',
+             {'email': data.user.email, 'password': PASSWORD}, False),
+            ('logout', 'post', '/api/auth/token/logout/', None, True),
+        )
+
+    def run_route(self, data, method, path, payload, authorized):
+        client = APIClient()
+        if authorized:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {data.token.key}')
+        cache.clear()
+        log = QueryLog()
+        with transaction.atomic():
+            with connection.execute_wrapper(log):
+                response = getattr(client, method)(
+                    path, payload, format='json')
+            transaction.set_rollback(True)
+        self.assertLess(
+            response.status_code, 400,
+            f'{method.upper()} {path}: {getattr(response, "data", "")}')
+        return log
+
+    def measure(self, scale):
+        with transaction.atomic():
+            data = self.make_dataset(scale)
+            logs = [self.run_route(data, method, path, payload, authorized)
+                    for _, method, path, payload, authorized
+                    in self.routes(data)]
+            transaction.set_rollback(True)
+        return logs
+
+    def test_every_route_is_measured(self):
+        with transaction.atomic():
+            data = self.make_dataset(1)
+            measured = {route[0] for route in self.routes(data)}
+            transaction.set_rollback(True)
+        unmeasured = (set(url_names(urls.urlpatterns))
+                      - measured - UNMEASURED)
+        self.assertFalse(unmeasured, 'Маршруты без проверки числа запросов')
+
+    def test_query_count_does_not_grow(self):
+        small, large = self.measure(1), self.measure(3)
+        with transaction.atomic():
+            routes = self.routes(self.make_dataset(1))
+            transaction.set_rollback(True)
+        for route, small_log, large_log in zip(routes, small, large):
+            name, method, path = route[:3]
+            with self.subTest(route=name, method=method, path=path,
+                              authorized=route[4]):
+                self.assertEqual(
+                    len(small_log.queries), len(large_log.queries),
+                    '\n' + report(small_log, large_log))
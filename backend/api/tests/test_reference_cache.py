@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from food.cache import get_tags
+from food.models import Ingredient, Recipe, Tag
+from food.search import ingredient_index
+from user.models import User
+
+
+class ReferenceCacheTest(TestCase):
+    """Справочники из кэша.
+
+    Замер на 6 авторах по 6 рецептов, запрос с токеном (1 запрос
+    на авторизацию), кэш прогрет; без кэша справочников -> с ним:
+
+        GET  /api/tags/                   2 -> 1
+        GET  /api/tags/{id}/              2 -> 1
+        GET  /api/ingredients/{id}/       2 -> 1
+        GET  /api/recipes/?tags=...       7 -> 6
+        GET  /api/recipes/{id}/           5 -> 5
+        GET  /api/users/subscriptions/    4 -> 4
+        POST /api/recipes/               14 -> 10
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = Tag.objects.create(name='Завтрак', color='#E26C2D')
+        cls.dinner = Tag.objects.create(name='Ужин', color='#8775D2')
+        cls.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл')
+        cls.author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Каша', text='Варить',
+            cooking_time=10, image='recipes/porridge.png')
+        cls.recipe.tags.set([cls.breakfast])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_tags_are_served_from_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(
+            [tag['slug'] for tag in response.json()], ['zavtrak', 'uzhin'])
+        with self.assertNumQueries(0):
+            self.client.get('/api/tags/')
+            self.client.get(f'/api/tags/{self.dinner.id}/')
+
+    def test_tag_changes_invalidate_cache(self):
+        get_tags()
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', color='#49B64E')
+        self.assertIn('obed', [tag['slug'] for tag in get_tags()])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dinner.delete()
+        self.assertNotIn('uzhin', [tag['slug'] for tag in get_tags()])
+        self.assertEqual(
+            self.client.get(f'/api/tags/{self.dinner.id}/').status_code, 404)
+
+    def test_ingredient_changes_rebuild_index(self):
+        with self.assertNumQueries(1):
+            ingredient_index.search('мол')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/ingredients/{self.milk.id}/')
+        self.assertEqual(response.json()['name'], 'молоко')
+        self.milk.name = 'молоко топлёное'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.milk.save()
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search('мол')],
+            ['молоко топлёное'])
+
+    def test_tag_filter_resolves_slugs_from_cache(self):
+        get_tags()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/recipes/?tags=zavtrak')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse([
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT "food_tag"')])
+        response = self.client.get('/api/recipes/?tags=uzhin')
+        self.assertEqual(response.json()['count'], 0)
+        response = self.client.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, 400)
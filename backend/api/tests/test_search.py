@@ -0,0 +1,49 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import Recipe
+from user.models import User
+
+
+class RecipeSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(
+            username='author', email='author@foodgram.ru')
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Борщ', text='Свёкла и капуста',
+            cooking_time=60, image='recipes/recipe.png')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = APIClient().get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_text_changes_update_index(self):
+        self.assertEqual(self.search('свекла'), [self.recipe.id])
+        Recipe.objects.filter(id=self.recipe.id).update(name='Щи')
+        cache.clear()
+        self.assertEqual(self.search('щи'), [self.recipe.id])
+        self.assertEqual(self.search('борщ'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'индекс FTS5 только в SQLite')
+    def test_counter_updates_skip_index(self):
+        def changes(**fields):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT total_changes()')
+                before = cursor.fetchone()[0]
+                Recipe.objects.filter(id=self.recipe.id).update(**fields)
+                cursor.execute('SELECT total_changes()')
+                return cursor.fetchone()[0] - before
+
+        self.assertEqual(
+            changes(favorites_count=F('favorites_count') + 1), 1)
+        self.assertGreater(changes(text='Свёкла'), 1)
@@ -0,0 +1,186 @@
+import math
+from collections import Counter
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import make_ingredients, make_recipe, make_tags
+from food import similar
+from food.models import AmountIngredient, Recipe, SimilarRecipe
+from foodgram_backend import constants as c
+from user.models import User
+
+LIMIT = c.FoodContant.SIMILAR_RECIPES_LIMIT
+
+
+def expected_score(first, second, ingredients, tags, total):
+    """Косинус векторов IDF по ингредиентам и Жаккар по тэгам."""
+    frequency = Counter(
+        ingredient for recipe_ingredients in ingredients.values()
+        for ingredient in recipe_ingredients)
+
+    def weight(ingredient):
+        return (math.log((1 + total) / (1 + frequency[ingredient])) + 1) ** 2
+
+    def norm(recipe_id):
+        return math.sqrt(sum(map(weight, ingredients[recipe_id])))
+
+    cosine = (sum(map(weight, ingredients[first] & ingredients[second]))
+              / norm(first) / norm(second))
+    first_tags, second_tags = tags.get(first, set()), tags.get(second, set())
+    union = first_tags | second_tags
+    jaccard = len(first_tags & second_tags) / len(union) if union else 0
+    return similar.INGREDIENT_WEIGHT * cosine + similar.TAG_WEIGHT * jaccard
+
+
+def make_index(ingredients, tags, total):
+    frequency = Counter(
+        ingredient for recipe_ingredients in ingredients.values()
+        for ingredient in recipe_ingredients)
+    return similar.SimilarityIndex(ingredients, tags, total, frequency)
+
+
+class SimilarityIndexTest(SimpleTestCase):
+    ingredients = {
+        1: {1, 2, 3},
+        2: {1, 2, 3},
+        3: {1, 2, 4},
+        4: {3, 5},
+        5: {6},
+        6: {7, 8},
+        7: {1, 2, 3},
+    }
+    tags = {1: {1, 2}, 2: {3}, 3: {1, 2}, 4: {1}, 6: {2}, 7: {1}}
+
+    def test_scores_match_definition(self):
+        # При большом total все ингредиенты редкие: отбор кандидатов
+        # ничего не отбрасывает, и оценка считается для всех пар.
+        total = 1000
+        index = make_index(self.ingredients, self.tags, total)
+        for recipe_id, own in self.ingredients.items():
+            with self.subTest(recipe_id=recipe_id):
+                expected = sorted((
+                    (round(expected_score(recipe_id, other, self.ingredients,
+                                          self.tags, total), 6), other)
+                    for other, ingredients in self.ingredients.items()
+                    if other != recipe_id and own & ingredients),
+                    reverse=True)
+                self.assertEqual(index.neighbours(recipe_id), expected)
+
+    def test_shared_tags_rank_equal_ingredients(self):
+        index = make_index(self.ingredients, self.tags, 1000)
+        self.assertEqual(
+            [other for _, other in index.neighbours(1)[:2]], [7, 2])
+        self.assertEqual(index.neighbours(5), [])
+
+    def test_limit(self):
+        index = make_index(self.ingredients, self.tags, 1000)
+        self.assertEqual(index.neighbours(1, limit=2),
+                         index.neighbours(1)[:2])
+
+    def test_common_ingredients_still_give_candidates(self):
+        ingredients = {
+            recipe_id: {0, recipe_id % 3 + 1} for recipe_id in range(1, 31)}
+        ingredients[31] = {0}
+        index = make_index(ingredients, {}, len(ingredients))
+        neighbours = index.neighbours(31)
+        self.assertEqual(len(neighbours), LIMIT)
+        self.assertTrue(all(score > 0 for score, _ in neighbours))
+
+
+class SimilarRecipesTest(TestCase):
+    recipe_count = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = make_tags()
+        cls.ingredient_list = make_ingredients(42)
+        author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass')
+        cls.recipes = []
+        for number in range(cls.recipe_count):
+            positions = {number % 10, 10 + number // 3 % 10, 40}
+            if not number % 3:
+                positions.add(41)
+            cls.recipes.append(make_recipe(
+                author, f'Рецепт {number}', tags=cls.tags[:number % 3 + 1],
+                ingredients=[cls.ingredient_list[position]
+                             for position in positions]))
+
+    def setUp(self):
+        cache.clear()
+
+    def stored(self, recipe_id):
+        return [
+            (score, other) for other, score in
+            SimilarRecipe.objects.filter(recipe=recipe_id)
+            .order_by('-score', 'similar_id')
+            .values_list('similar_id', 'score')[:LIMIT]]
+
+    def current(self):
+        ingredients = similar.group(AmountIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'))
+        tags = similar.group(Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'))
+        return ingredients, tags
+
+    def test_rebuild_stores_neighbours(self):
+        rows = similar.rebuild()
+        index = similar.load_index()
+        ingredients, tags = self.current()
+        self.assertEqual(rows, SimilarRecipe.objects.count())
+        for recipe in self.recipes:
+            with self.subTest(recipe=recipe.id):
+                stored = self.stored(recipe.id)
+                self.assertTrue(stored)
+                self.assertEqual(
+                    sorted(stored, key=lambda item: (-item[0], item[1])),
+                    sorted(index.neighbours(recipe.id),
+                           key=lambda item: (-item[0], item[1])))
+                for score, other in stored:
+                    self.assertNotEqual(other, recipe.id)
+                    self.assertAlmostEqual(score, expected_score(
+                        recipe.id, other, ingredients, tags,
+                        self.recipe_count), places=5)
+
+    def test_refresh_matches_rebuild(self):
+        similar.rebuild()
+        first, second = self.recipes[1], self.recipes[2]
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=second, ingredient_id=ingredient_id,
+                             amount=10)
+            for ingredient_id in
+            set(first.ingredients.values_list('id', flat=True))
+            - set(second.ingredients.values_list('id', flat=True)))
+        second.tags.set(first.tags.all())
+        similar.refresh(second.id)
+        refreshed = self.stored(second.id)
+        self.assertEqual(refreshed[0][1], first.id)
+        self.assertIn(second.id, [
+            other for _, other in self.stored(first.id)])
+        similar.rebuild()
+        self.assertEqual(refreshed, self.stored(second.id))
+        self.assertEqual(self.stored(first.id)[0][1], second.id)
+
+    def test_refresh_removes_stale_pairs(self):
+        similar.rebuild()
+        recipe = self.recipes[4]
+        neighbours = [other for _, other in self.stored(recipe.id)]
+        AmountIngredient.objects.filter(recipe=recipe).delete()
+        similar.refresh(recipe.id)
+        self.assertEqual(self.stored(recipe.id), [])
+        self.assertFalse(SimilarRecipe.objects.filter(
+            recipe__in=neighbours, similar=recipe).exists())
+
+    def test_endpoint(self):
+        similar.rebuild()
+        client = APIClient()
+        recipe = self.recipes[0]
+        response = client.get(f'/api/recipes/{recipe.id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['score'], item['id']) for item in response.data],
+            self.stored(recipe.id))
+        self.assertEqual(
+            client.get('/api/recipes/0/similar/').status_code, 404)
@@ -0,0 +1,30 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from user.models import Subscribe, User
+
+
+class SubscriptionsLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create(
+                username=username, email=f'{username}@foodgram.ru')
+            for username in ('reader', 'author')]
+
+    def get(self, recipes_limit):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get('/api/users/subscriptions/',
+                          {'recipes_limit': recipes_limit})
+
+    def test_invalid_limit_without_subscriptions(self):
+        response = self.get('abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
+
+    def test_invalid_limit_with_subscriptions(self):
+        Subscribe.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.get('abc').status_code, 400)
+        self.assertEqual(self.get('-1').status_code, 400)
+        self.assertEqual(self.get('2').status_code, 200)
@@ -0,0 +1,50 @@
+import re
+
+from django.test import TestCase, override_settings
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+from food.models import Recipe
+from user.models import User
+
+METRIC = re.compile(r'(\w+);(?:dur=([\d.]+))?(?:;?desc="([^"]*)")?')
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass')
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=5, image='recipes/recipe.png')
+            for number in range(3))
+
+    def metrics(self, path, view):
+        with self.assertLogs('foodgram.timing') as logs:
+            response = APIClient().get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'size={len(response.content)}', logs.output[0])
+        self.assertIn(f'view={view} ', logs.output[0])
+        return response, {
+            name: (dur, desc)
+            for name, dur, desc in METRIC.findall(response['Server-Timing'])}
+
+    def test_header_reports_serializer_time_and_size(self):
+        response, metrics = self.metrics('/api/recipes/', 'RecipeViewSet.list')
+        self.assertEqual(
+            set(metrics), {'db', 'serialize', 'view', 'total', 'size'})
+        self.assertGreater(float(metrics['serialize'][0]), 0)
+        self.assertEqual(
+            metrics['size'][1], f'{len(response.content)} bytes')
+
+    def test_serializers_are_not_patched(self):
+        self.metrics('/api/recipes/', 'RecipeViewSet.list')
+        self.assertFalse(hasattr(BaseSerializer.data.fget, 'timed'))
+        self.assertEqual(BaseSerializer.data.fget.__qualname__,
+                         'BaseSerializer.data')
+
+    def test_views_without_serializers(self):
+        _, metrics = self.metrics('/api/tags/', 'TagViewSet.list')
+        self.assertEqual(float(metrics['serialize'][0]), 0)
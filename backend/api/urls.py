@@ -1,4 +1,4 @@
-from django.urls import include, path
+from django.urls import URLPattern, include, path
 from rest_framework.routers import DefaultRouter
 
 from . import views
@@ -11,22 +11,47 @@ router.register('recipes', views.RecipeViewSet)
 router.register('ingredients', views.IngredientViewSet, basename='ingredients')
 router.register('users', views.UserViewSet)
 
-urlpatterns = [
-    path(
-        'users/<int:pk>/subscribe/',
-        views.APICreateDeleteSubscribe.as_view()),
-    path(
-        'users/subscriptions/',
-        views.APISubscribe.as_view()),
-    path(
-        '',
-        include(
-            router.urls)),
-    path(
-        'auth/',
-        include('djoser.urls.authtoken')),
-    path(
-        '',
-        include('djoser.urls')),
-
-]
+ASYNC_ROUTES = ('tags-list', 'tags-detail', 'ingredients-list',
+                'ingredients-detail', 'recipe-list', 'recipe-detail',
+                'recipe-feed', 'recipe-similar', 'recipe-pantry')
+
+
+def get_urlpatterns(read_view=None):
+    """Маршруты API; `read_view` оборачивает маршруты из ASYNC_ROUTES.
+
+    Под WSGI обёртки не нужны: асинхронное представление там выполнялось
+    бы через async_to_sync с отдельным циклом событий на каждый запрос.
+    """
+    def wrap(view):
+        return read_view(view) if read_view else view
+
+    router_urls = [
+        URLPattern(url.pattern, wrap(url.callback),
+                   url.default_args, url.name)
+        if url.name in ASYNC_ROUTES else url
+        for url in router.urls
+    ]
+    return [
+        path(
+            'users/<int:pk>/subscribe/',
+            views.APICreateDeleteSubscribe.as_view(),
+            name='subscribe'),
+        path(
+            'users/subscriptions/',
+            wrap(views.APISubscribe.as_view()),
+            name='subscriptions'),
+        path(
+            '',
+            include(
+                router_urls)),
+        path(
+            'auth/',
+            include('djoser.urls.authtoken')),
+        path(
+            '',
+            include('djoser.urls')),
+
+    ]
+
+
+urlpatterns = get_urlpatterns()
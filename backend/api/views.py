@@ -1,31 +1,59 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from rest_framework import generics, status, viewsets
+from rest_framework import generics, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from food.models import (AmountIngredient, Favorite, Ingredient, Recipe,
-                         ShoppingCart, Tag)
+from food.batch import add_recipes, remove_recipes
+from food.cache import (get_recipe_author, get_shopping_cart, get_tags,
+                        get_tags_by_id)
+from food.models import (AmountIngredient, Favorite, FeedEntry, Ingredient,
+                         Recipe, ShoppingCart, Tag)
+from food.pantry import pantry_index
+from food.search import ingredient_index
+from food.versions import profile_scope
+from foodgram_backend import constants as c
+from foodgram_backend.timing import ServerTimingMixin
 from user.models import Subscribe, User
 from user.serializers import (PasswordSerializer, UserCreationSerializer,
                               UserReadSerializer)
 
+from .conditional import conditional_get
+from .exporters import SHOPPING_CART_EXPORTERS
 from .filters import RecipeFilter
-from .pagination import CustomPagination, SubscribePagination
+from .pagination import (CustomPagination, FeedPagination, RecipePagination,
+                         SubscribePagination)
 from .permissions import RecipePermission
+from .renderers import CSVRenderer, PlainTextRenderer
 from .serializers import (AmountIngredientSerializer, BaseRecipeSerializer,
-                          IngredientSerializer, RecipeChangeSerializer,
-                          RecipeReadSerializer, ShoppingCartSerializer,
+                          IngredientSerializer, PantryRecipeSerializer,
+                          PantrySerializer, RecipeBatchSerializer,
+                          RecipeChangeSerializer, RecipeReadSerializer,
+                          ShoppingCartSerializer, SimilarRecipeSerializer,
                           SubscribeCreateSerializer, SubscribeSerializer,
                           TagSerializer)
 
 
-class UserViewSet(DjoserUserViewSet):
+def parse_pk(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise Http404
+
+
+def author_scope(request, pk):
+    """Рецепт показывает своего автора: ETag зависит только от него."""
+    author_id = get_recipe_author(parse_pk(pk))
+    return author_id and profile_scope(author_id)
+
+
+class UserViewSet(ServerTimingMixin, DjoserUserViewSet):
     permission_classes = (AllowAny,)
     pagination_class = CustomPagination
 
@@ -34,6 +62,19 @@ class UserViewSet(DjoserUserViewSet):
             return UserReadSerializer
         return UserCreationSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        return queryset.annotate(is_subscribed=Exists(
+            Subscribe.objects.filter(user=user, author=OuterRef('pk'))))
+
+    def get_instance(self):
+        # У пользователя из кэша токенов загружен только id.
+        return self.get_queryset().get(pk=self.request.user.pk)
+
     @action(detail=False, methods=['get'],
             pagination_class=None,
             permission_classes=(IsAuthenticated,))
@@ -50,36 +91,65 @@ class UserViewSet(DjoserUserViewSet):
                         status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ServerTimingMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
+    @conditional_get('tag')
+    def list(self, request, *args, **kwargs):
+        return Response(get_tags())
+
+    @conditional_get('tag')
+    def retrieve(self, request, *args, **kwargs):
+        tag = get_tags_by_id().get(parse_pk(kwargs['pk']))
+        if tag is None:
+            raise Http404
+        return Response(tag)
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(ServerTimingMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = Ingredient.objects.all()
-        filter_value = self.request.query_params.get('name', None)
-        if filter_value:
-            queryset = queryset.filter(name__icontains=filter_value)
-        return queryset
+    @conditional_get('ingredient')
+    def list(self, request, *args, **kwargs):
+        return Response(
+            ingredient_index.search(request.query_params.get('name', '')))
+
+    @conditional_get('ingredient')
+    def retrieve(self, request, *args, **kwargs):
+        ingredient = ingredient_index.get(parse_pk(kwargs['pk']))
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all().order_by('-id')
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     permission_classes = (RecipePermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_related()
+        return queryset.with_user_flags(self.request.user)
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrive'):
+        if self.action in ('list', 'retrieve'):
             return RecipeReadSerializer
         return RecipeChangeSerializer
 
+    @conditional_get('recipe', 'tag', 'ingredient', author_scope,
+                     per_user=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -90,7 +160,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if not Favorite.objects.filter(user=request.user,
                                        recipe=recipe).exists():
             Favorite.objects.create(user=request.user, recipe=recipe)
-            serializer = BaseRecipeSerializer(recipe)
+            serializer = self.timed_serializer(BaseRecipeSerializer(recipe))
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED)
@@ -113,7 +183,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if not ShoppingCart.objects.filter(user=request.user,
                                            recipe=recipe).exists():
             ShoppingCart.objects.create(user=request.user, recipe=recipe)
-            serializer = BaseRecipeSerializer(recipe)
+            serializer = self.timed_serializer(BaseRecipeSerializer(recipe))
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED)
@@ -130,33 +200,98 @@ class RecipeViewSet(viewsets.ModelViewSet):
                                     'удален из списка покупок.')},
                         status=status.HTTP_204_NO_CONTENT)
 
+    def change_batch(self, request, model):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        change = add_recipes if request.method == 'POST' else remove_recipes
+        results = change(
+            model, request.user, serializer.validated_data['recipes'])
+        return Response({'results': [
+            {'id': recipe_id, 'status': result}
+            for recipe_id, result in results.items()]})
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='favorite/batch',
+            permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request, **kwargs):
+        return self.change_batch(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/batch',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request, **kwargs):
+        return self.change_batch(request, ShoppingCart)
+
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
+    def feed(self, request, **kwargs):
+        paginator = FeedPagination()
+        entries = paginator.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user).values('recipe_id'),
+            request, view=self)
+        ids = [entry['recipe_id'] for entry in entries]
+        recipes = Recipe.objects.filter(id__in=ids).with_related()
+        recipes = recipes.with_user_flags(request.user).in_bulk()
+        serializer = self.timed_serializer(RecipeReadSerializer(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes],
+            many=True, context=self.get_serializer_context()))
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=(AllowAny,))
+    def pantry(self, request, **kwargs):
+        params = PantrySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = pantry_index.match(
+            params.validated_data['ingredients'],
+            params.validated_data.get('tags'),
+            params.validated_data.get('max_missing'))
+        paginator = CustomPagination()
+        missing = dict(paginator.paginate_queryset(
+            matches, request, view=self))
+        recipes = Recipe.objects.filter(id__in=missing).with_related()
+        recipes = recipes.with_user_flags(request.user).in_bulk()
+        page = []
+        for recipe_id, count in missing.items():
+            if recipe_id in recipes:
+                recipes[recipe_id].missing = count
+                page.append(recipes[recipe_id])
+        serializer = self.timed_serializer(PantryRecipeSerializer(
+            page, many=True, context=self.get_serializer_context()))
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], permission_classes=(AllowAny,))
+    def similar(self, request, **kwargs):
+        recipe_id = parse_pk(kwargs['pk'])
+        recipes = (
+            Recipe.objects.filter(similar_to__recipe=recipe_id)
+            .annotate(score=F('similar_to__score'))
+            .order_by('-score', 'id')[:c.FoodContant.SIMILAR_RECIPES_LIMIT])
+        if not recipes and not Recipe.objects.filter(id=recipe_id).exists():
+            raise Http404
+        serializer = self.timed_serializer(SimilarRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()))
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer))
     def download_shopping_cart(self, request, **kwargs):
-        ingredients = (
-            AmountIngredient.objects
-            .filter(recipe__shopping_user__user=request.user)
-            .values('ingredient')
-            .annotate(total_amount=Sum('amount'))
-            .values_list('ingredient__name', 'total_amount',
-                         'ingredient__measurement_unit')
-        )
-        file_list = []
-        [file_list.append(
-            '{} - {} {}.'.format(*ingredient)) for ingredient in ingredients]
-        file = HttpResponse('Cписок покупок:\n' + '\n'.join(file_list),
-                            content_type='text/plain')
+        renderer = request.accepted_renderer
+        export = SHOPPING_CART_EXPORTERS[renderer.format]
+        file = StreamingHttpResponse(
+            export(get_shopping_cart(request.user)),
+            content_type=f'{renderer.media_type}; charset=utf-8')
         file['Content-Disposition'] = (
-            'attachment; filename=shopping_cart.txt')
+            f'attachment; filename=shopping_cart.{renderer.format}')
         return file
 
 
-class AmountIngredientViewSet(viewsets.ModelViewSet):
+class AmountIngredientViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     queryset = AmountIngredient.objects.all()
     serializer_class = AmountIngredientSerializer
 
 
-class APISubscribe(generics.ListAPIView):
+class APISubscribe(ServerTimingMixin, generics.ListAPIView):
     serializer_class = SubscribeSerializer
     pagination_class = SubscribePagination
 
@@ -164,12 +299,39 @@ class APISubscribe(generics.ListAPIView):
         queryset = User.objects.filter(subscribing__user=self.request.user)
         return queryset
 
+    def get_recipes_limit(self):
+        value = self.request.query_params.get('recipes_limit')
+        if value is None:
+            return None
+        field = serializers.IntegerField(min_value=0)
+        try:
+            return field.run_validation(value)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'recipes_limit': error.detail})
+
+    def paginate_queryset(self, queryset):
+        # Параметр проверяется и при пустой странице подписок.
+        limit = self.get_recipes_limit()
+        authors = super().paginate_queryset(queryset)
+        if not authors:
+            return authors
+        recipes_by_author = {author.id: [] for author in authors}
+        recipes = (Recipe.objects
+                   .filter(author__in=recipes_by_author)
+                   .latest_per_author(limit))
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = recipes_by_author[author.id]
+        return authors
+
 
-class APICreateDeleteSubscribe(APIView):
+class APICreateDeleteSubscribe(ServerTimingMixin, APIView):
     def post(self, request, pk):
         id = self.request.user.id
         data = {'user': id, 'author': pk}
-        serializer = SubscribeCreateSerializer(data=data)
+        serializer = self.timed_serializer(
+            SubscribeCreateSerializer(data=data))
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -186,8 +348,9 @@ class APICreateDeleteSubscribe(APIView):
                         status=status.HTTP_204_NO_CONTENT)
 
 
-class APIShoppingCart(APIView):
+class APIShoppingCart(ServerTimingMixin, APIView):
     def get(self, request):
         carts = ShoppingCart.objects.filter(user=request.user)
-        serializer = ShoppingCartSerializer(carts, many=True)
+        serializer = self.timed_serializer(
+            ShoppingCartSerializer(carts, many=True))
         return Response(serializer.data)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from .cache import invalidate_recipe_shopping_carts
 from .models import AmountIngredient, Favorite, Ingredient, Recipe, Tag
 
 admin.site.register(Ingredient)
@@ -15,7 +16,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ['author', 'name', 'tags']
 
     def sudscriptions(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 @admin.register(Tag)
@@ -31,3 +32,11 @@ class AmountIngredientAdmin(admin.ModelAdmin):
     def measurement_unit(self, obj):
         return obj.ingredient.measurement_unit
     measurement_unit.short_description = ''
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_recipe_shopping_carts(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_recipe_shopping_carts(obj.recipe_id)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class FoodConfig(AppConfig):
     name = 'food'
+
+    def ready(self):
+        from . import signals  # noqa: F401
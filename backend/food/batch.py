@@ -0,0 +1,96 @@
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+
+from .cache import invalidate_shopping_carts
+from .counters import COUNTERS, count_by
+from .models import Recipe, ShoppingCart
+from .versions import bump_versions, user_scope
+
+COUNTER_FIELDS = {
+    related_model: field
+    for model, field, related_model, _ in COUNTERS if model is Recipe}
+
+CREATED = 'created'
+DELETED = 'deleted'
+EXISTS = 'exists'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+
+def split_recipes(model, user, recipe_ids):
+    """Одним запросом делит id на отмеченные, не отмеченные и чужие.
+
+    Возвращает множества (отмеченные, не отмеченные) существующих рецептов.
+    """
+    recipes = (
+        Recipe.objects.filter(id__in=recipe_ids)
+        .annotate(is_marked=Exists(model.objects.filter(
+            user=user, recipe=OuterRef('pk'))))
+        .values_list('id', 'is_marked'))
+    marked, unmarked = set(), set()
+    for recipe_id, is_marked in recipes:
+        (marked if is_marked else unmarked).add(recipe_id)
+    return marked, unmarked
+
+
+def after_change(model, user, recipe_ids):
+    """То же, что делают сигналы для одной записи, но одним запросом.
+
+    bulk_create и удаление без выборки сигналов не отправляют. Счётчики
+    пересчитываются, а не сдвигаются на число id: ignore_conflicts
+    пропускает уже добавленные строки, а параллельный запрос может
+    удалить строку раньше.
+    """
+    field = COUNTER_FIELDS[model]
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        **{field: count_by(model, 'recipe')})
+    transaction.on_commit(lambda: bump_versions(user_scope(user.id)))
+    if model is ShoppingCart:
+        transaction.on_commit(lambda: invalidate_shopping_carts([user.id]))
+
+
+def delete_marks(model, user, recipe_ids):
+    """Удаляет отметки одним DELETE, без выборки строк и сигналов.
+
+    QuerySet.delete() сначала выбирает строки, чтобы отправить сигналы
+    и удалить зависимые объекты. Зависимых объектов у модели нет,
+    а работу сигналов делает after_change.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    meta = model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.get_field("user").column)} = %s '
+            f'AND {quote(meta.get_field("recipe").column)} IN '
+            f'({", ".join(["%s"] * len(recipe_ids))})',
+            [user.id, *recipe_ids])
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """Добавляет рецепты в избранное или список покупок пачкой."""
+    marked, unmarked = split_recipes(model, user, recipe_ids)
+    if unmarked:
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=recipe_id) for recipe_id in unmarked],
+            ignore_conflicts=True)
+        after_change(model, user, unmarked)
+    return {
+        recipe_id: (CREATED if recipe_id in unmarked
+                    else EXISTS if recipe_id in marked else NOT_FOUND)
+        for recipe_id in recipe_ids}
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Убирает рецепты из избранного или списка покупок пачкой."""
+    marked, unmarked = split_recipes(model, user, recipe_ids)
+    if marked:
+        delete_marks(model, user, marked)
+        after_change(model, user, marked)
+    return {
+        recipe_id: (DELETED if recipe_id in marked
+                    else ABSENT if recipe_id in unmarked else NOT_FOUND)
+        for recipe_id in recipe_ids}
@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db.models import Sum
+
+from foodgram_backend import constants as c
+from foodgram_backend.replicas import primary
+
+from .models import AmountIngredient, Ingredient, Recipe, ShoppingCart, Tag
+from .versions import get_versions
+
+SHOPPING_CART_KEY = 'shopping_cart:{}'
+TAGS_KEY = 'tags:{}'
+INGREDIENTS_KEY = 'ingredients:{}'
+RECIPE_AUTHOR_KEY = 'recipe_author:{}'
+
+
+def get_reference_data(scope, key, build):
+    """Данные справочника из кэша под ключом текущей версии модели."""
+    (token, _), = get_versions(scope)
+    key = key.format(token)
+    data = cache.get(key)
+    if data is None:
+        with primary():
+            data = build()
+        cache.set(key, data, c.FoodContant.REFERENCE_CACHE_TIMEOUT)
+    return data
+
+
+def get_tags():
+    return get_reference_data(
+        'tag', TAGS_KEY,
+        lambda: list(Tag.objects.values('id', 'name', 'color', 'slug')))
+
+
+def get_tags_by_id():
+    return {tag['id']: tag for tag in get_tags()}
+
+
+def get_tag_ids_by_slug():
+    return {tag['slug']: tag['id'] for tag in get_tags() if tag['slug']}
+
+
+def get_ingredients():
+    return get_reference_data(
+        'ingredient', INGREDIENTS_KEY,
+        lambda: list(Ingredient.objects.values(
+            'id', 'name', 'measurement_unit')))
+
+
+def get_recipe_author(recipe_id):
+    """id автора рецепта или None. Автор рецепта не меняется."""
+    key = RECIPE_AUTHOR_KEY.format(recipe_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Recipe.objects.filter(id=recipe_id).values_list(
+            'author_id', flat=True).first()
+        if author_id is not None:
+            cache.set(key, author_id, c.FoodContant.REFERENCE_CACHE_TIMEOUT)
+    return author_id
+
+
+def get_shopping_cart(user):
+    """Суммарный список ингредиентов из рецептов в списке покупок."""
+    key = SHOPPING_CART_KEY.format(user.id)
+    ingredients = cache.get(key)
+    if ingredients is None:
+        with primary():
+            ingredients = list(
+                AmountIngredient.objects
+                .filter(recipe__shoppingcart__user=user)
+                .values('ingredient')
+                .annotate(total_amount=Sum('amount'))
+                .values_list('ingredient__name', 'total_amount',
+                             'ingredient__measurement_unit')
+                .order_by('ingredient__name')
+            )
+        cache.set(key, ingredients,
+                  c.FoodContant.SHOPPING_CART_CACHE_TIMEOUT)
+    return ingredients
+
+
+def invalidate_shopping_carts(user_ids):
+    cache.delete_many(
+        [SHOPPING_CART_KEY.format(user_id) for user_id in user_ids])
+
+
+def invalidate_recipe_shopping_carts(recipe_id):
+    invalidate_shopping_carts(
+        ShoppingCart.objects.filter(recipe=recipe_id)
+        .values_list('user_id', flat=True))
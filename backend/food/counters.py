@@ -0,0 +1,51 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from user.models import User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+
+def count_by(model, field):
+    """Подзапрос: число строк `model`, ссылающихся на внешний объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()),
+        0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+)
+
+
+# Объекты, которые удаляются прямо сейчас. Строки, удалённые каскадом
+# вместе с ними, не обновляют их счётчики: строка всё равно исчезнет.
+# Если удаление откатится, разошедшийся счётчик исправит recount().
+deleting = set()
+
+
+def change_counter(model, pk, field, delta):
+    if (model, pk) in deleting:
+        return
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def recount():
+    """Пересчитывает счётчики там, где они разошлись с данными.
+
+    Возвращает число исправленных строк для каждого счётчика.
+    """
+    repaired = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = count_by(related_model, related_field)
+        repaired[f'{model._meta.model_name}.{field}'] = (
+            model.objects.annotate(actual=actual)
+            .exclude(**{field: F('actual')})
+            .update(**{field: actual}))
+    return repaired
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from foodgram_backend import constants as c
+from user.models import Subscribe
+
+from .models import FeedEntry, Recipe
+
+
+def insert_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=c.FoodContant.LOAD_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты всех подписчиков автора."""
+    subscribers = Subscribe.objects.filter(
+        author=recipe.author_id).values_list('user_id', flat=True)
+    insert_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                  author_id=recipe.author_id)
+        for user_id in subscribers.iterator())
+
+
+def backfill(user_id, author_id):
+    """Кладёт в ленту последние рецепты автора, на которого подписались.
+
+    Более старые рецепты в ленту не попадают, их видно по фильтру автора.
+    """
+    recipe_ids = (Recipe.objects.filter(author=author_id).order_by('-id')
+                  .values_list('id', flat=True)
+                  [:c.FoodContant.FEED_BACKFILL_LIMIT])
+    insert_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+        for recipe_id in recipe_ids)
+
+
+def prune(user_id, author_id):
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def rebuild():
+    """Заполняет ленты заново по подпискам, например после загрузки
+    данных в обход сигналов. Один INSERT ... SELECT по номерам рецептов
+    внутри автора."""
+    FeedEntry.objects.all().delete()
+    ranked = Recipe.objects.annotate(row_number=Window(
+        expression=RowNumber(),
+        partition_by=[F('author_id')],
+        order_by=F('id').desc())).values('id', 'author_id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            '(user_id, recipe_id, author_id) '
+            'SELECT subscribe.user_id, ranked.id, ranked.author_id '
+            f'FROM {Subscribe._meta.db_table} subscribe '
+            f'JOIN ({sql}) ranked ON ranked.author_id = subscribe.author_id '
+            'WHERE ranked.row_number <= %s',
+            (*params, c.FoodContant.FEED_BACKFILL_LIMIT))
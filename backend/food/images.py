@@ -0,0 +1,96 @@
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('foodgram.images')
+
+RECIPE_IMAGES_DIR = 'recipes'
+# Размеры производных картинок: card обрезается точно под карточку,
+# detail вписывается в рамку без обрезки.
+DERIVATIVE_SIZES = {
+    'card': (480, 320),
+    'detail': (1200, 800),
+}
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_name(name, size, file_format):
+    root, _ = posixpath.splitext(name)
+    return f'{root}_{size}.{file_format}'
+
+
+def derivative_names(name):
+    return {
+        size: {file_format: derivative_name(name, size, file_format)
+               for file_format in DERIVATIVE_FORMATS}
+        for size in DERIVATIVE_SIZES}
+
+
+def resize(image, size, width, height):
+    if size == 'card':
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return image
+
+
+def make_derivatives(name, content=None):
+    """Создаёт отсутствующие производные картинки для `name`."""
+    missing = [
+        (size, file_format, path)
+        for size, formats in derivative_names(name).items()
+        for file_format, path in formats.items()
+        if not default_storage.exists(path)]
+    if not missing:
+        return
+    if content is None:
+        with default_storage.open(name) as file:
+            content = file.read()
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+    image = image.convert('RGB')
+    resized = {}
+    for size, file_format, path in missing:
+        if size not in resized:
+            resized[size] = resize(image, size, *DERIVATIVE_SIZES[size])
+        pil_format, options = DERIVATIVE_FORMATS[file_format]
+        buffer = io.BytesIO()
+        resized[size].save(buffer, pil_format, **options)
+        default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def ensure_derivatives(name):
+    """Как make_derivatives, но ошибка картинки не ломает сохранение.
+
+    Без исходного файла делать нечего: его ссылка тоже не откроется.
+    """
+    if not default_storage.exists(name):
+        return
+    try:
+        make_derivatives(name)
+    except (OSError, ValueError) as error:
+        logger.warning('%s: %s', name, error)
+
+
+def save_recipe_image(file):
+    """Сохраняет картинку под именем из хэша содержимого.
+
+    Одинаковые картинки хранятся один раз, производные для уже
+    сохранённой картинки повторно не кодируются.
+    """
+    content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    extension = posixpath.splitext(file.name)[1].lower()
+    name = posixpath.join(
+        RECIPE_IMAGES_DIR, digest[:2], f'{digest}{extension}')
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(content))
+    make_derivatives(name, content)
+    return name
@@ -0,0 +1,193 @@
+import json
+import pathlib
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from food.models import AmountIngredient, Favorite, Ingredient, Recipe, Tag
+from user.models import User
+
+DEFAULT_BASELINE = pathlib.Path(settings.BASE_DIR, 'benchmarks',
+                                'baseline.json')
+# Самые частые ингредиенты: типичный набор продуктов дома.
+PANTRY_SIZE = 50
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = 'measure latency and query count of API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--save', nargs='?', const=DEFAULT_BASELINE, type=pathlib.Path,
+            help='записать результаты в файл базовой линии')
+        parser.add_argument(
+            '--compare', nargs='?', const=DEFAULT_BASELINE,
+            type=pathlib.Path,
+            help='сравнить с файлом базовой линии')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='допустимый рост p95 при сравнении, доля')
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=2.0,
+            help='рост p95 меньше этого числа миллисекунд не считается '
+                 'регрессией: быстрые запросы шумят сильнее')
+
+    def get_endpoints(self):
+        """Имя замера, маршрут из api/urls.py и параметры запроса.
+
+        Параметры None означают запрос без токена.
+
+        Пути строятся через reverse, поэтому переименованный маршрут
+        сразу сломает замер, а не будет тихо пропущен.
+        """
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if not (recipe and tag and ingredient):
+            raise CommandError(
+                'База пуста, сначала выполните generate_dataset.')
+        pantry = list(
+            AmountIngredient.objects.values_list('ingredient', flat=True)
+            .annotate(total=Count('id')).order_by('-total')[:PANTRY_SIZE])
+        return (
+            ('tags', 'api:tags-list', {}, {}),
+            ('tag', 'api:tags-detail', {'pk': tag.id}, {}),
+            ('ingredients', 'api:ingredients-list', {}, {}),
+            ('ingredients_search', 'api:ingredients-list', {},
+             {'name': ingredient.name[:3]}),
+            ('ingredient', 'api:ingredients-detail',
+             {'pk': ingredient.id}, {}),
+            ('recipes_anonymous', 'api:recipe-list', {}, None),
+            ('recipes', 'api:recipe-list', {}, {}),
+            ('recipes_page_50', 'api:recipe-list', {},
+             {'page': 50, 'limit': 6}),
+            ('recipes_cursor', 'api:recipe-list', {}, {'cursor': ''}),
+            ('recipes_tags', 'api:recipe-list', {}, {'tags': tag.slug}),
+            ('recipes_favorited', 'api:recipe-list', {},
+             {'is_favorited': 1}),
+            ('recipes_in_cart', 'api:recipe-list', {},
+             {'is_in_shopping_cart': 1}),
+            ('recipes_author', 'api:recipe-list', {},
+             {'author': recipe.author_id}),
+            ('recipes_search', 'api:recipe-list', {},
+             {'search': recipe.name.split()[0]}),
+            ('recipe', 'api:recipe-detail', {'pk': recipe.id}, {}),
+            ('similar', 'api:recipe-similar', {'pk': recipe.id}, None),
+            ('pantry', 'api:recipe-pantry', {}, {'ingredients': pantry}),
+            ('pantry_tags', 'api:recipe-pantry', {},
+             {'ingredients': pantry, 'tags': tag.slug, 'max_missing': 1}),
+            ('feed', 'api:recipe-feed', {}, {}),
+            ('feed_page_size_50', 'api:recipe-feed', {}, {'limit': 50}),
+            ('shopping_cart', 'api:recipe-download-shopping-cart', {}, {}),
+            ('users', 'api:user-list', {}, {}),
+            ('user', 'api:user-detail', {'id': recipe.author_id}, {}),
+            ('me', 'api:user-me', {}, {}),
+            ('subscriptions', 'api:subscriptions', {},
+             {'recipes_limit': 3}),
+        )
+
+    def get_user(self):
+        """Самый активный пользователь: у него больше всего избранного."""
+        row = (Favorite.objects.values('user')
+               .annotate(total=Count('id')).order_by('-total').first())
+        if row is None:
+            return User.objects.order_by('id').first()
+        return User.objects.get(id=row['user'])
+
+    def measure(self, client, url, params, number, warmup):
+        for _ in range(warmup):
+            client.get(url, params)
+        timings = []
+        for _ in range(number):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(
+                f'{url}: ответ {response.status_code}.')
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url, params)
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': len(queries),
+        }
+
+    def compare(self, results, path):
+        baseline = json.loads(path.read_text())['endpoints']
+        failures = []
+        self.stdout.write(
+            f'{"endpoint":<20}{"p95, ms":>10}{"base":>10}{"delta":>9}'
+            f'{"queries":>9}{"base":>6}')
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                self.stdout.write(f'{name:<20}нет в базовой линии')
+                continue
+            delta = result['p95_ms'] / base['p95_ms'] - 1
+            self.stdout.write(
+                f'{name:<20}{result["p95_ms"]:>10.1f}{base["p95_ms"]:>10.1f}'
+                f'{delta:>+9.0%}{result["queries"]:>9}{base["queries"]:>6}')
+            if result['queries'] > base['queries']:
+                failures.append(f'{name}: запросов {result["queries"]} '
+                                f'вместо {base["queries"]}')
+            if (delta > self.tolerance and result['p95_ms']
+                    - base['p95_ms'] > self.min_delta_ms):
+                failures.append(f'{name}: p95 вырос на {delta:.0%}')
+        if failures:
+            raise CommandError('Регрессия:\n' + '\n'.join(failures))
+
+    def handle(self, *args, **options):
+        self.tolerance = options['tolerance']
+        self.min_delta_ms = options['min_delta_ms']
+        if options['number'] < 1:
+            raise CommandError('--number должен быть больше 0.')
+        host = settings.ALLOWED_HOSTS[0]
+        user = self.get_user()
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            True: Client(HTTP_HOST=host,
+                         HTTP_AUTHORIZATION=f'Token {token.key}'),
+            False: Client(HTTP_HOST=host),
+        }
+        results = {}
+        for name, url_name, kwargs, params in self.get_endpoints():
+            client = clients[params is not None]
+            results[name] = self.measure(
+                client, reverse(url_name, kwargs=kwargs), params or {},
+                options['number'], options['warmup'])
+            if not options['compare']:
+                self.stdout.write(
+                    f'{name:<20}p50 {results[name]["p50_ms"]:>8.1f} ms'
+                    f'  p95 {results[name]["p95_ms"]:>8.1f} ms'
+                    f'  queries {results[name]["queries"]:>3}')
+        if options['save']:
+            options['save'].parent.mkdir(parents=True, exist_ok=True)
+            options['save'].write_text(json.dumps({
+                'meta': {
+                    'vendor': connection.vendor,
+                    'recipes': Recipe.objects.count(),
+                    'users': User.objects.count(),
+                    'number': options['number'],
+                },
+                'endpoints': results,
+            }, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {options["save"]}'))
+        if options['compare']:
+            self.compare(results, options['compare'])
@@ -0,0 +1,38 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from food.models import Ingredient
+from food.search import ingredient_index
+
+QUERIES = ('', 'с', 'мол', 'сыр', 'масло', 'ёлка', 'перец черный', 'xyz')
+
+
+class Command(BaseCommand):
+    help = 'compare ingredient index search with icontains queryset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200)
+
+    def queryset_search(self, name):
+        queryset = Ingredient.objects.all()
+        if name:
+            queryset = queryset.filter(name__icontains=name)
+        return list(queryset.values('id', 'name', 'measurement_unit'))
+
+    def handle(self, *args, **options):
+        number = options['number']
+        ingredient_index.invalidate()
+        build = timeit.timeit(ingredient_index.search, number=1)
+        self.stdout.write(f'index build: {build * 1000:.2f} ms')
+        self.stdout.write(
+            f'{"query":<16}{"queryset, us":>14}{"index, us":>12}{"x":>8}')
+        for query in QUERIES:
+            database = timeit.timeit(
+                lambda: self.queryset_search(query), number=number) / number
+            index = timeit.timeit(
+                lambda: ingredient_index.search(query),
+                number=number) / number
+            self.stdout.write(
+                f'{query!r:<16}{database * 1e6:>14.1f}{index * 1e6:>12.1f}'
+                f'{database / index:>8.1f}')
@@ -0,0 +1,117 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'foodgram_backend.wsgi',
+             '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+    'asgi': ['uvicorn', 'foodgram_backend.asgi:application',
+             '--workers', '{workers}', '--port', '{port}',
+             '--log-level', 'warning'],
+}
+URLS = ('/api/recipes/', '/api/tags/', '/api/ingredients/?name=мол',
+        '/api/recipes/?limit=20')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'compare requests per second and latency of WSGI and ASGI servers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--token', help='токен для запросов')
+        parser.add_argument('--url', action='append', dest='urls')
+
+    def wait_ready(self, port, process):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Сервер не запустился.')
+            try:
+                socket.create_connection(('127.0.0.1', port), 0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('Сервер не ответил за 30 секунд.')
+
+    def client(self, port, urls, headers, stop_at, latencies, errors):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        number = 0
+        while time.monotonic() < stop_at:
+            url = urls[number % len(urls)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', url, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors.append(url)
+                connection.close()
+                continue
+            if response.status >= 400:
+                errors.append(url)
+            latencies.append(time.perf_counter() - started)
+
+    def run_load(self, port, options):
+        urls = options['urls'] or URLS
+        headers = {'Host': settings.ALLOWED_HOSTS[0]}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        latencies, errors = [], []
+        stop_at = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(target=self.client, args=(
+                port, urls, headers, stop_at, latencies, errors))
+            for _ in range(options['concurrency'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        latencies.sort()
+        if not latencies:
+            raise CommandError('Ни один запрос не выполнен.')
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            'errors': len(errors),
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"server":<8}{"rps":>10}{"p50, ms":>10}{"p99, ms":>10}'
+            f'{"errors":>8}')
+        for name, command in SERVERS.items():
+            port = free_port()
+            process = subprocess.Popen(
+                [part.format(port=port, workers=options['workers'])
+                 for part in command],
+                cwd=settings.BASE_DIR, env=os.environ.copy(),
+                stdout=subprocess.DEVNULL, stderr=sys.stderr)
+            try:
+                self.wait_ready(port, process)
+                result = self.run_load(port, options)
+            finally:
+                process.terminate()
+                process.wait()
+            self.stdout.write(
+                f'{name:<8}{result["rps"]:>10.1f}{result["p50"]:>10.1f}'
+                f'{result["p99"]:>10.1f}{result["errors"]:>8}')
@@ -0,0 +1,204 @@
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from food.counters import recount
+from food.feed import rebuild as rebuild_feeds
+from food.models import (AmountIngredient, Favorite, FeedEntry, Ingredient,
+                         Recipe, ShoppingCart, Tag)
+from food.pantry import PANTRY_SCOPE
+from food.similar import rebuild as rebuild_similar
+from food.versions import bump_versions
+from foodgram_backend import constants as c
+from user.models import Subscribe, User
+
+TAGS = (('Завтрак', '#E26C2D'), ('Обед', '#49B64E'), ('Ужин', '#8775D2'),
+        ('Десерт', '#F2C94C'), ('Выпечка', '#B07D62'), ('Суп', '#2D9CDB'))
+WORDS = ('суп', 'салат', 'пирог', 'каша', 'запеканка', 'омлет', 'рагу',
+         'паста', 'котлеты', 'блины', 'гуляш', 'плов', 'сырники', 'борщ')
+PASSWORD = 'bench-password'
+
+
+class PowerLaw:
+    """Выбор из `population` с вероятностью 1 / ранг ** exponent.
+
+    Ранги перемешаны, чтобы популярность не совпадала с порядком id.
+    """
+
+    def __init__(self, rng, population, exponent):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)))
+
+    def sample(self, k):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k)
+
+    def distinct(self, k):
+        """До `k` разных значений: популярные чаще попадают в выборку."""
+        k = min(k, len(self.population))
+        chosen = set()
+        for _ in range(4):
+            chosen.update(self.sample(k - len(chosen)))
+            if len(chosen) == k:
+                break
+        return chosen
+
+
+class Command(BaseCommand):
+    help = 'generate a reproducible synthetic dataset for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='в среднем избранных рецептов на пользователя')
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='в среднем рецептов в списке покупок на пользователя')
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='в среднем подписок на пользователя')
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='показатель степенного закона популярности')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=c.FoodContant.LOAD_BATCH_SIZE)
+
+    def heavy_tail(self, mean, limit):
+        """Длина списка с распределением Парето и средним около `mean`."""
+        alpha = 1.5
+        value = self.rng.paretovariate(alpha) * mean * (alpha - 1) / alpha
+        return min(int(value), limit)
+
+    def insert(self, model, rows):
+        started = time.perf_counter()
+        total = 0
+        while batch := list(islice(rows, self.batch_size)):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{model._meta.db_table}: {total} строк за {elapsed:.1f} с')
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def users(self, first_id, count):
+        password = make_password(PASSWORD)
+        for user_id in range(first_id, first_id + count):
+            yield User(
+                id=user_id, username=f'bench{user_id}',
+                email=f'bench{user_id}@example.com', password=password,
+                first_name='Тест', last_name=f'Пользователь {user_id}')
+
+    def recipes(self, first_id, count, authors):
+        for recipe_id, author_id in zip(
+                range(first_id, first_id + count), authors.sample(count)):
+            words = self.rng.sample(WORDS, 2)
+            yield Recipe(
+                id=recipe_id, author_id=author_id,
+                name=f'{words[0].capitalize()} и {words[1]} {recipe_id}',
+                text=' '.join(self.rng.choices(WORDS, k=30)),
+                cooking_time=self.rng.randint(5, 180),
+                image='recipes/synthetic.jpg')
+
+    def recipe_ingredients(self, recipe_ids, ingredients):
+        for recipe_id in recipe_ids:
+            count = max(1, min(20, round(self.rng.gauss(8, 3))))
+            for ingredient_id in ingredients.distinct(count):
+                yield AmountIngredient(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500))
+
+    def recipe_tags(self, recipe_ids, tag_ids):
+        through = Recipe.tags.through
+        for recipe_id in recipe_ids:
+            for tag_id in self.rng.sample(
+                    tag_ids, self.rng.randint(1, min(3, len(tag_ids)))):
+                yield through(recipe_id=recipe_id, tag_id=tag_id)
+
+    def user_recipes(self, model, user_ids, recipes, mean):
+        for user_id in user_ids:
+            count = self.heavy_tail(mean, len(recipes.population))
+            for recipe_id in recipes.distinct(count):
+                yield model(user_id=user_id, recipe_id=recipe_id)
+
+    def subscriptions(self, user_ids, authors, mean):
+        for user_id in user_ids:
+            count = self.heavy_tail(mean, len(authors.population))
+            for author_id in authors.distinct(count) - {user_id}:
+                yield Subscribe(user_id=user_id, author_id=author_id)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0.')
+        if options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и рецепт.')
+        ingredient_ids = sorted(
+            Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов, сначала выполните load_csv.')
+        if not Tag.objects.exists():
+            for name, color in TAGS:
+                Tag.objects.create(name=name, color=color)
+        tag_ids = sorted(Tag.objects.values_list('id', flat=True))
+        exponent = options['exponent']
+        started = time.perf_counter()
+        with transaction.atomic():
+            first_user = self.next_id(User)
+            user_ids = range(first_user, first_user + options['users'])
+            first_recipe = self.next_id(Recipe)
+            recipe_ids = range(
+                first_recipe, first_recipe + options['recipes'])
+            authors = PowerLaw(self.rng, user_ids, exponent)
+            ingredients = PowerLaw(self.rng, ingredient_ids, exponent)
+            self.insert(User, self.users(first_user, options['users']))
+            self.insert(Recipe, self.recipes(
+                first_recipe, options['recipes'], authors))
+            self.insert(AmountIngredient, self.recipe_ingredients(
+                recipe_ids, ingredients))
+            self.insert(Recipe.tags.through,
+                        self.recipe_tags(recipe_ids, tag_ids))
+            recipes = PowerLaw(self.rng, recipe_ids, exponent)
+            self.insert(Favorite, self.user_recipes(
+                Favorite, user_ids, recipes, options['favorites']))
+            self.insert(ShoppingCart, self.user_recipes(
+                ShoppingCart, user_ids, recipes, options['carts']))
+            self.insert(Subscribe, self.subscriptions(
+                user_ids, authors, options['subscriptions']))
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [User, Recipe]):
+                    cursor.execute(sql)
+            recount()
+            started_feeds = time.perf_counter()
+            rebuild_feeds()
+            self.stdout.write(
+                f'food_feedentry: {FeedEntry.objects.count()} строк за '
+                f'{time.perf_counter() - started_feeds:.1f} с')
+            started_similar = time.perf_counter()
+            rows = rebuild_similar()
+            self.stdout.write(
+                f'food_similarrecipe: {rows} строк за '
+                f'{time.perf_counter() - started_similar:.1f} с')
+            transaction.on_commit(lambda: bump_versions(
+                'recipe', 'tag', 'ingredient', PANTRY_SCOPE))
+        self.stdout.write(self.style.SUCCESS(
+            f'Набор данных создан за {time.perf_counter() - started:.1f} с. '
+            f'Пароль пользователей: {PASSWORD}'))
@@ -1,21 +1,99 @@
 import csv
+import json
 import pathlib
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from food.models import Ingredient
+from food.versions import bump_versions
+from foodgram_backend import constants as c
 
 
 class Command(BaseCommand):
-    help = 'load csv files to sql database'
+    help = 'load ingredients from csv or json file to sql database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='food/data/ingredients.csv',
+            help='путь к файлу .csv или .json')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=c.FoodContant.LOAD_BATCH_SIZE,
+            help='количество строк в одном INSERT')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='только проверить файл, ничего не записывая')
+
+    def read_csv(self, file):
+        for number, row in enumerate(csv.reader(file, delimiter=','), 1):
+            if len(row) != 2:
+                raise CommandError(f'Строка {number}: ожидается 2 колонки.')
+            yield row
+
+    def read_json(self, file):
+        for number, item in enumerate(json.load(file), 1):
+            try:
+                yield item['name'], item['measurement_unit']
+            except (KeyError, TypeError):
+                raise CommandError(
+                    f'Запись {number}: нужны name и measurement_unit.')
+
+    def read_rows(self, path):
+        readers = {'.csv': self.read_csv, '.json': self.read_json}
+        if path.suffix not in readers:
+            raise CommandError('Поддерживаются только файлы .csv и .json.')
+        with open(path, encoding='utf-8') as file:
+            for name, measurement_unit in readers[path.suffix](file):
+                name, measurement_unit = name.strip(), measurement_unit.strip()
+                if (not name or not measurement_unit
+                        or len(name) > c.FoodContant.MAX_INGREDIENT_NAME
+                        or len(measurement_unit)
+                        > c.FoodContant.MAX_MEASUREMENT_UNIT_LENGTH):
+                    raise CommandError(
+                        f'Некорректный ингредиент: {name!r}, '
+                        f'{measurement_unit!r}.')
+                yield Ingredient(name=name,
+                                 measurement_unit=measurement_unit)
+
+    def process(self, rows, batch_size, save):
+        total = 0
+        while batch := list(islice(rows, batch_size)):
+            if save:
+                Ingredient.objects.bulk_create(
+                    batch, batch_size=batch_size, ignore_conflicts=True)
+            total += len(batch)
+            self.stdout.write(f'Обработано строк: {total}')
+        return total
 
     def handle(self, *args, **options):
-        category_path = pathlib.Path("food/data/ingredients.csv")
-        with open(category_path.absolute(),
-                  encoding='utf-8') as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=',')
-            for row in csv_reader:
-                name, measurement_unit = row
-                ingredient = Ingredient(name=name,
-                                        measurement_unit=measurement_unit)
-                ingredient.save()
+        path = pathlib.Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден.')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0.')
+        started = time.perf_counter()
+        rows = self.read_rows(path)
+        if options['dry_run']:
+            # Проверка файла не открывает транзакцию и не сбрасывает кэши.
+            total = self.process(rows, batch_size, save=False)
+            elapsed = time.perf_counter() - started
+            rate = total / elapsed if elapsed else total
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено {total} строк за {elapsed:.2f} с '
+                f'({rate:.0f} строк/с), ошибок нет.'))
+            return
+        before = Ingredient.objects.count()
+        with transaction.atomic():
+            total = self.process(rows, batch_size, save=True)
+            transaction.on_commit(lambda: bump_versions('ingredient'))
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else total
+        created = Ingredient.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {elapsed:.2f} с '
+            f'({rate:.0f} строк/с): добавлено {created}, '
+            f'пропущено {total - created}.'))
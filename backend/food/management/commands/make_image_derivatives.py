@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from food.images import make_derivatives
+from food.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'create missing resized copies of recipe images'
+
+    def handle(self, *args, **options):
+        names = (Recipe.objects.exclude(image='')
+                 .values_list('image', flat=True).distinct())
+        for name in names.iterator():
+            try:
+                make_derivatives(name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'repair favorites_count, in_carts_count and recipes_count'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = recount()
+        for counter, rows in repaired.items():
+            self.stdout.write(f'{counter}: исправлено строк {rows}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
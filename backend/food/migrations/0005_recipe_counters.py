@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 18:28
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_by(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()),
+        0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('food', 'Recipe')
+    Favorite = apps.get_model('food', 'Favorite')
+    ShoppingCart = apps.get_model('food', 'ShoppingCart')
+    User = apps.get_model('user', 'User')
+    Recipe.objects.update(
+        favorites_count=count_by(Favorite, 'recipe'),
+        in_carts_count=count_by(ShoppingCart, 'recipe'))
+    User.objects.update(recipes_count=count_by(Recipe, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_alter_ingredient_measurement_unit_and_more'),
+        ('user', '0010_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 3.2 on 2026-10-18 18:29
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    """
+    CREATE FUNCTION food_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER food_recipe_search_vector_update
+    BEFORE INSERT OR UPDATE ON food_recipe
+    FOR EACH ROW EXECUTE PROCEDURE food_recipe_search_vector()
+    """,
+    'UPDATE food_recipe SET search_vector = NULL',
+    """
+    CREATE INDEX food_recipe_search_vector_gin
+    ON food_recipe USING gin (search_vector)
+    """,
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS food_recipe_search_vector_gin',
+    'DROP TRIGGER IF EXISTS food_recipe_search_vector_update ON food_recipe',
+    'DROP FUNCTION IF EXISTS food_recipe_search_vector()',
+)
+
+
+def sqlite_values(row):
+    """id, name и text строки с ё, заменённой на е, для индекса FTS5."""
+    return ', '.join(
+        [f'{row}.id']
+        + [f"replace(replace({row}.{column}, 'ё', 'е'), 'Ё', 'Е')"
+           for column in ('name', 'text')])
+
+
+SQLITE_FORWARD = (
+    """
+    CREATE VIRTUAL TABLE food_recipe_fts USING fts5(
+        name, text, tokenize='unicode61 remove_diacritics 2')
+    """,
+    f"""
+    CREATE TRIGGER food_recipe_fts_insert AFTER INSERT ON food_recipe BEGIN
+        INSERT INTO food_recipe_fts(rowid, name, text)
+        VALUES ({sqlite_values('new')});
+    END
+    """,
+    """
+    CREATE TRIGGER food_recipe_fts_delete AFTER DELETE ON food_recipe BEGIN
+        DELETE FROM food_recipe_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER food_recipe_fts_update AFTER UPDATE ON food_recipe BEGIN
+        DELETE FROM food_recipe_fts WHERE rowid = old.id;
+        INSERT INTO food_recipe_fts(rowid, name, text)
+        VALUES ({sqlite_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO food_recipe_fts(rowid, name, text)
+    SELECT {sqlite_values('food_recipe')} FROM food_recipe
+    """,
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS food_recipe_fts_insert',
+    'DROP TRIGGER IF EXISTS food_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS food_recipe_fts_update',
+    'DROP TABLE IF EXISTS food_recipe_fts',
+)
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRESQL_FORWARD,
+                            'sqlite': SQLITE_FORWARD}),
+            run_for_vendor({'postgresql': POSTGRESQL_BACKWARD,
+                            'sqlite': SQLITE_BACKWARD})),
+    ]
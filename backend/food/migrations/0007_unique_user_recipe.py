@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 18:47
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_by(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()),
+        0)
+
+
+def remove_duplicates(apps, schema_editor):
+    """Ограничение было объявлено, но не создавалось: удаляем повторы
+    и пересчитываем счётчики затронутых рецептов."""
+    Recipe = apps.get_model('food', 'Recipe')
+    for model_name, counter in (('Favorite', 'favorites_count'),
+                                ('ShoppingCart', 'in_carts_count')):
+        model = apps.get_model('food', model_name)
+        duplicates = list(
+            model.objects.values('user', 'recipe')
+            .annotate(first=Min('id'), total=Count('id'))
+            .filter(total__gt=1))
+        for row in duplicates:
+            model.objects.filter(
+                user=row['user'], recipe=row['recipe'],
+            ).exclude(id=row['first']).delete()
+        Recipe.objects.filter(
+            id__in={row['recipe'] for row in duplicates},
+        ).update(**{counter: count_by(model, 'recipe')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0006_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='shoppingcart'),
+        ),
+    ]
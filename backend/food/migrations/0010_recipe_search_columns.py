@@ -0,0 +1,56 @@
+# Generated by Django 3.2 on 2026-10-18 21:05
+
+from django.db import migrations
+
+POSTGRESQL_TRIGGER = """
+    CREATE TRIGGER food_recipe_search_vector_update
+    BEFORE INSERT OR UPDATE{columns} ON food_recipe
+    FOR EACH ROW EXECUTE PROCEDURE food_recipe_search_vector()
+"""
+POSTGRESQL_DROP = (
+    'DROP TRIGGER IF EXISTS food_recipe_search_vector_update ON food_recipe')
+
+
+def sqlite_trigger(columns):
+    values = ', '.join(
+        ['new.id']
+        + [f"replace(replace(new.{column}, 'ё', 'е'), 'Ё', 'Е')"
+           for column in ('name', 'text')])
+    return f"""
+    CREATE TRIGGER food_recipe_fts_update
+    AFTER UPDATE{columns} ON food_recipe BEGIN
+        DELETE FROM food_recipe_fts WHERE rowid = old.id;
+        INSERT INTO food_recipe_fts(rowid, name, text) VALUES ({values});
+    END
+    """
+
+
+SQLITE_DROP = 'DROP TRIGGER IF EXISTS food_recipe_fts_update'
+# Поисковый индекс пересчитывается только при изменении названия или
+# текста: обновления счётчиков через F() его не трогают.
+COLUMNS = ' OF name, text'
+
+
+def recreate_triggers(columns):
+    statements = {
+        'postgresql': (POSTGRESQL_DROP,
+                       POSTGRESQL_TRIGGER.format(columns=columns)),
+        'sqlite': (SQLITE_DROP, sqlite_trigger(columns)),
+    }
+
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0009_similar_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_triggers(COLUMNS),
+                             recreate_triggers('')),
+    ]
@@ -1,11 +1,15 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import RowNumber
 from django.utils.text import slugify
 from transliterate import translit
 
 from foodgram_backend import constants as c
-from user.models import User
+from user.models import Subscribe, User
 
 
 class Tag(models.Model):
@@ -46,6 +50,45 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        """Подгружает автора, тэги и ингредиенты для вывода рецептов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('recipe',
+                     queryset=AmountIngredient.objects.select_related(
+                         'ingredient')))
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и списка покупок."""
+        if not user.is_authenticated:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(is_favorited=false,
+                                 is_in_shopping_cart=false,
+                                 author_is_subscribed=false)
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Subscribe.objects.filter(
+                user=user, author=OuterRef('author'))))
+
+    def latest_per_author(self, limit):
+        """Последние `limit` рецептов каждого автора одним запросом."""
+        if limit is None:
+            return self.order_by('-id')
+        ranked = self.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc()))
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            'ORDER BY id DESC',
+            (*params, limit))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -73,6 +116,14 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient, through='AmountIngredient')
     tags = models.ManyToManyField(Tag, related_name='recipe')
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном')
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В списках покупок')
+    # Заполняется триггером PostgreSQL, на SQLite поиск идёт по FTS5.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -136,16 +187,76 @@ class UniqueTogetherFields(models.Model):
 
 
 class Favorite(UniqueTogetherFields):
-    class Meta:
+    class Meta(UniqueTogetherFields.Meta):
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
 
 class ShoppingCart(UniqueTogetherFields):
-    class Meta:
+    class Meta(UniqueTogetherFields.Meta):
         verbose_name = 'Рецепт в списке покупок'
         verbose_name_plural = 'Рецепты в списке покупок'
 
     def __str__(self):
         return (f'пользователь {self.user.username}'
                 f'имеет в списке покупок {self.recipe.name}')
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика его автора.
+
+    Лента читается одним проходом по индексу (user, recipe) в обратном
+    порядке; author нужен, чтобы при отписке удалить записи по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик')
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry')]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='feed_entry_user_author')]
+
+
+class SimilarRecipe(models.Model):
+    """Заранее посчитанный похожий рецепт с оценкой сходства."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт')
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт')
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe')]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='similar_recipe_score')]
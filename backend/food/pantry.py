@@ -0,0 +1,187 @@
+import threading
+from collections import defaultdict
+
+from foodgram_backend.replicas import primary
+
+from .models import AmountIngredient, Recipe
+from .versions import get_versions
+
+PANTRY_SCOPE = 'pantry'
+
+
+def bitset(positions, size):
+    """Число, в котором установлены биты с номерами `positions`."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def set_bits(bits):
+    """Номера установленных битов по убыванию."""
+    binary = bin(bits)
+    top = len(binary) - 1
+    position = binary.find('1', 2)
+    while position != -1:
+        yield top - position
+        position = binary.find('1', position + 1)
+
+
+def count_bits(bits):
+    """Число установленных битов: int.bit_count есть только с Python 3.10."""
+    return bin(bits).count('1')
+
+
+def add_bits(counter, bits):
+    """Прибавляет 0 или 1 к каждому счётчику в побитовых срезах.
+
+    counter[level] содержит бит `level` счётчика каждого рецепта, так
+    что сложение всех рецептов — несколько операций над целыми числами.
+    """
+    for level, level_bits in enumerate(counter):
+        if not bits:
+            return
+        counter[level], bits = level_bits ^ bits, level_bits & bits
+    if bits:
+        counter.append(bits)
+
+
+def equal_bits(counter, value, bits):
+    """Биты из `bits`, у которых счётчик равен `value`."""
+    if value >> len(counter):
+        return 0
+    for level, level_bits in enumerate(counter):
+        bits &= level_bits if value >> level & 1 else ~level_bits
+    return bits
+
+
+class PantryMatches:
+    """Рецепты по числу недостающих ингредиентов, внутри — новые первыми.
+
+    Ведёт себя как последовательность для Paginator: id рецептов
+    вычисляются только для запрошенной страницы.
+    """
+
+    def __init__(self, groups, recipe_ids):
+        self.groups = groups
+        self.recipe_ids = recipe_ids
+
+    def __len__(self):
+        return sum(count_bits(bits) for _, bits in self.groups)
+
+    def __getitem__(self, page):
+        skip, left = page.start or 0, page.stop - (page.start or 0)
+        result = []
+        for missing, bits in self.groups:
+            if left <= 0:
+                break
+            total = count_bits(bits)
+            if skip >= total:
+                skip -= total
+                continue
+            for number, position in enumerate(set_bits(bits)):
+                if number < skip:
+                    continue
+                result.append((self.recipe_ids[position], missing))
+                left -= 1
+                if not left:
+                    break
+            skip = 0
+        return result
+
+
+class PantryIndex:
+    """Инвертированный индекс ингредиент → множество рецептов в памяти.
+
+    Множества рецептов хранятся битами целых чисел, номер бита — место
+    рецепта в списке по возрастанию id. Индекс перестраивается, когда
+    меняется версия PANTRY_SCOPE: её поднимают только добавление и
+    удаление рецептов, их ингредиентов и тэгов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Метка версии и индекс меняются вместе одним присваиванием.
+        self._state = (None, None)
+
+    def _build(self):
+        with primary():
+            recipe_ids = list(
+                Recipe.objects.order_by('id').values_list('id', flat=True))
+            positions = {
+                recipe_id: position
+                for position, recipe_id in enumerate(recipe_ids)}
+            by_ingredient = defaultdict(list)
+            sizes = [0] * len(recipe_ids)
+            # Рецепты, добавленные после первого запроса, пропускаются:
+            # их сохранение поднимет версию, и индекс соберётся заново.
+            for recipe_id, ingredient_id in (
+                    AmountIngredient.objects
+                    .values_list('recipe_id', 'ingredient_id').iterator()):
+                position = positions.get(recipe_id)
+                if position is not None:
+                    by_ingredient[ingredient_id].append(position)
+                    sizes[position] += 1
+            by_tag = defaultdict(list)
+            for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+                    'recipe_id', 'tag_id'):
+                if recipe_id in positions:
+                    by_tag[tag_id].append(positions[recipe_id])
+        by_size = defaultdict(list)
+        for position, size in enumerate(sizes):
+            if size:
+                by_size[size].append(position)
+        total = len(recipe_ids)
+        return (
+            recipe_ids,
+            {ingredient_id: bitset(value, total)
+             for ingredient_id, value in by_ingredient.items()},
+            {tag_id: bitset(value, total) for tag_id, value in by_tag.items()},
+            sorted((size, bitset(value, total))
+                   for size, value in by_size.items()),
+        )
+
+    def _load(self):
+        (token, _), = get_versions(PANTRY_SCOPE)
+        current, index = self._state
+        if current == token:
+            return index
+        with self._lock:
+            current, index = self._state
+            if current != token:
+                index = self._build()
+                self._state = (token, index)
+            return index
+
+    def match(self, ingredient_ids, tag_ids=None, max_missing=None):
+        """Рецепты, где есть хотя бы один ингредиент из `ingredient_ids`.
+
+        `tag_ids` оставляет рецепты хотя бы с одним из тэгов,
+        `max_missing` — с не большим числом недостающих ингредиентов.
+        """
+        recipe_ids, ingredients, tags, by_size = self._load()
+        found, counter = 0, []
+        for ingredient_id in set(ingredient_ids):
+            bits = ingredients.get(ingredient_id, 0)
+            found |= bits
+            add_bits(counter, bits)
+        if tag_ids is not None:
+            tag_bits = 0
+            for tag_id in tag_ids:
+                tag_bits |= tags.get(tag_id, 0)
+            found &= tag_bits
+        groups = defaultdict(int)
+        for size, size_bits in by_size:
+            left = found & size_bits
+            fewest = 1 if max_missing is None else max(1, size - max_missing)
+            for matched in range(size, fewest - 1, -1):
+                if not left:
+                    break
+                bits = equal_bits(counter, matched, left)
+                groups[size - matched] |= bits
+                left ^= bits
+        return PantryMatches(
+            sorted(item for item in groups.items() if item[1]), recipe_ids)
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,124 @@
+import bisect
+import re
+import threading
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
+
+from foodgram_backend import constants as c
+
+from .cache import get_ingredients
+from .versions import get_versions
+
+
+def fold(value):
+    """Приводит строку к виду для поиска: регистр и ё/е не различаются."""
+    return value.strip().casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Строится при первом обращении и перестраивается, когда меняется
+    версия ингредиентов в кэше. Сначала возвращаются совпадения по началу
+    названия, затем по подстроке, внутри групп — в алфавитном порядке.
+    """
+
+    def __init__(self, limit=c.FoodContant.INGREDIENT_SEARCH_LIMIT):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._token = None
+        self._index = None
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._index = None
+
+    def _build(self):
+        rows = sorted(
+            (fold(row['name']), row['name'], row['id'], row)
+            for row in get_ingredients())
+        keys = [row[0] for row in rows]
+        starts = []
+        offset = 0
+        for key in keys:
+            starts.append(offset)
+            offset += len(key) + 1
+        items = [row[3] for row in rows]
+        by_id = {item['id']: item for item in items}
+        return keys, starts, '\n'.join(keys), items, by_id
+
+    def _load(self):
+        (token, _), = get_versions('ingredient')
+        with self._lock:
+            if self._token != token:
+                self._index = self._build()
+                self._token = token
+            return self._index
+
+    def get(self, ingredient_id):
+        return self._load()[4].get(ingredient_id)
+
+    def search(self, query='', limit=None):
+        keys, starts, haystack, items, _ = self._load()
+        limit = self.limit if limit is None else limit
+        query = fold(query).replace('\n', ' ')
+        start = bisect.bisect_left(keys, query)
+        result = []
+        position = start
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(items[position])
+            position += 1
+        if not query or len(result) >= limit:
+            return result
+        offset = haystack.find(query)
+        while offset != -1 and len(result) < limit:
+            position = bisect.bisect_right(starts, offset) - 1
+            if offset != starts[position]:
+                result.append(items[position])
+            if position + 1 == len(starts):
+                break
+            offset = haystack.find(query, starts[position + 1])
+        return result
+
+
+ingredient_index = IngredientIndex()
+
+
+# bm25 считается в соединении с таблицей FTS5: в коррелированном
+# подзапросе MATCH выполнялся бы заново для каждой найденной строки.
+# Название весит в 10 раз больше описания; bm25 тем меньше, чем лучше.
+RECIPE_FTS_RANK = '-bm25(food_recipe_fts, 10.0, 1.0)'
+
+
+def fts_match(query):
+    """Запрос FTS5: все слова обязательны, каждое ищется по префиксу."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', fold(query)))
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск по названию и описанию с ранжированием.
+
+    На PostgreSQL — по полю search_vector с GIN-индексом и русской
+    морфологией, на SQLite — по таблице FTS5 food_recipe_fts.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config='russian', search_type='websearch')
+        return (queryset.filter(search_vector=search_query)
+                .annotate(rank=SearchRank(F('search_vector'), search_query))
+                .order_by('-rank', '-id'))
+    match = fts_match(query)
+    if not match:
+        return queryset.none()
+    return (queryset.extra(
+        tables=['food_recipe_fts'],
+        where=['food_recipe_fts.rowid = food_recipe.id',
+               'food_recipe_fts MATCH %s'],
+        params=[match],
+        select={'rank': RECIPE_FTS_RANK})
+        .order_by('-rank', '-id'))
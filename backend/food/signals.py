@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from user.models import Subscribe, User
+
+from .cache import invalidate_shopping_carts
+from .counters import change_counter, deleting
+from .feed import backfill, fan_out, prune
+from .images import ensure_derivatives
+from .models import (AmountIngredient, Favorite, Ingredient, Recipe,
+                     ShoppingCart, Tag)
+from .pantry import PANTRY_SCOPE
+from .versions import bump_versions, profile_scope, user_scope
+
+COUNTED_BY = {
+    Favorite: lambda favorite: (
+        Recipe, favorite.recipe_id, 'favorites_count'),
+    ShoppingCart: lambda cart: (Recipe, cart.recipe_id, 'in_carts_count'),
+    Recipe: lambda recipe: (User, recipe.author_id, 'recipes_count'),
+}
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def reset_shopping_cart(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_shopping_carts([instance.user_id]))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_model_version(sender, **kwargs):
+    scope = (Recipe if sender is Recipe.tags.through
+             else sender)._meta.model_name
+    transaction.on_commit(lambda: bump_versions(scope))
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_profile_version(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login, его нигде не видно.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(
+        lambda: bump_versions(profile_scope(instance.id)))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscribe)
+def bump_user_version(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: bump_versions(user_scope(instance.user_id)))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+def increase_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(*COUNTED_BY[sender](instance), 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+def decrease_counter(sender, instance, **kwargs):
+    change_counter(*COUNTED_BY[sender](instance), -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=User)
+def start_deleting(sender, instance, **kwargs):
+    deleting.add((sender, instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def finish_deleting(sender, instance, **kwargs):
+    deleting.discard((sender, instance.pk))
+
+
+def bump_pantry_version():
+    transaction.on_commit(lambda: bump_versions(PANTRY_SCOPE))
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_pantry(sender, created, **kwargs):
+    if created:
+        bump_pantry_version()
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry(sender, **kwargs):
+    bump_pantry_version()
+
+
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def change_recipe_ingredients(sender, instance, **kwargs):
+    # Ингредиенты удаляемого рецепта версии не поднимают: их поднимет
+    # удаление самого рецепта.
+    if (Recipe, instance.recipe_id) not in deleting:
+        transaction.on_commit(
+            lambda: bump_versions(Recipe._meta.model_name, PANTRY_SCOPE))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def change_pantry_tags(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_pantry_version()
+
+
+@receiver(post_save, sender=Recipe)
+def add_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    # Картинки из админки и других мест в обход API получают производные
+    # здесь; API создаёт их заранее, и проверка находит готовые файлы.
+    if not instance.image or (update_fields is not None
+                              and 'image' not in update_fields):
+        return
+    name = instance.image.name
+    transaction.on_commit(lambda: ensure_derivatives(name))
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Subscribe)
+def fill_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def prune_feed(sender, instance, **kwargs):
+    prune(instance.user_id, instance.author_id)
@@ -0,0 +1,199 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from foodgram_backend import constants as c
+
+from .models import AmountIngredient, Recipe, SimilarRecipe
+
+# Итоговая оценка: косинус по ингредиентам с весами IDF и Жаккар по тэгам.
+INGREDIENT_WEIGHT = 0.8
+TAG_WEIGHT = 0.2
+# Ингредиенты, которые есть больше чем в 10% рецептов (соль, сахар),
+# учитываются в оценке, но кандидатов по ним не ищем: иначе каждый
+# рецепт сравнивался бы почти со всеми.
+MAX_DOCUMENT_FREQUENCY = 0.1
+# Сколько кандидатов на одного соседа пересчитывать точно после
+# предварительного отбора по редким ингредиентам и тэгам.
+RESCORE_FACTOR = 5
+
+
+class SimilarityIndex:
+    """Разреженная матрица рецепт × ингредиент в виде списков вхождений.
+
+    Скалярные произведения строк считаются проходом по спискам
+    ингредиентов рецепта, как при умножении разреженных матриц.
+    """
+
+    def __init__(self, ingredients, tags, total, frequency):
+        self.ingredients = ingredients
+        self.frequency = frequency
+        self.weights = {
+            ingredient: (math.log((1 + total) / (1 + count)) + 1) ** 2
+            for ingredient, count in frequency.items()}
+        self.norms = {
+            recipe_id: math.sqrt(sum(
+                self.weights[ingredient] for ingredient in recipe_ingredients))
+            for recipe_id, recipe_ingredients in ingredients.items()}
+        self.tags = {
+            recipe_id: sum(1 << tag for tag in tags.get(recipe_id, ()))
+            for recipe_id in ingredients}
+        self.tag_sets = set(self.tags.values())
+        limit = max(1, MAX_DOCUMENT_FREQUENCY * total)
+        self.postings = defaultdict(list)
+        self.common_postings = {}
+        for recipe_id, recipe_ingredients in ingredients.items():
+            for ingredient in recipe_ingredients:
+                if frequency[ingredient] <= limit:
+                    self.postings[ingredient].append(recipe_id)
+
+    def candidates(self, recipe_id):
+        """Рецепты с общими редкими ингредиентами и произведения по ним."""
+        own = self.ingredients.get(recipe_id, ())
+        rare = [ingredient for ingredient in own
+                if ingredient in self.postings]
+        postings = self.postings
+        if not rare and own:
+            # Все ингредиенты частые: ищем среди рецептов с самым редким.
+            ingredient = min(own, key=self.frequency.__getitem__)
+            if ingredient not in self.common_postings:
+                self.common_postings[ingredient] = [
+                    other for other, ingredients in self.ingredients.items()
+                    if ingredient in ingredients]
+            rare, postings = [ingredient], self.common_postings
+        products = defaultdict(float)
+        for ingredient in rare:
+            weight = self.weights[ingredient]
+            for other in postings[ingredient]:
+                products[other] += weight
+        products.pop(recipe_id, None)
+        return products
+
+    def tag_scores(self, recipe_id):
+        """Вклад тэгов для каждого встречающегося набора тэгов."""
+        tags = self.tags[recipe_id]
+        return {
+            other_tags: TAG_WEIGHT * bin(tags & other_tags).count('1')
+            / bin(tags | other_tags).count('1') if tags | other_tags else 0
+            for other_tags in self.tag_sets}
+
+    def neighbours(self, recipe_id, limit=c.FoodContant.SIMILAR_RECIPES_LIMIT):
+        """Top-K похожих рецептов: список пар (оценка, id).
+
+        Сначала отбираются лучшие кандидаты по редким ингредиентам,
+        затем для них считается точная оценка со всеми ингредиентами.
+        """
+        norms, tags, weights = self.norms, self.tags, self.weights
+        if not norms.get(recipe_id):
+            return []
+        scale = INGREDIENT_WEIGHT / norms[recipe_id]
+        tag_scores = self.tag_scores(recipe_id)
+        best = heapq.nlargest(limit * RESCORE_FACTOR, (
+            (scale * product / norms[other] + tag_scores[tags[other]], other)
+            for other, product in self.candidates(recipe_id).items()))
+        own = self.ingredients[recipe_id]
+        return heapq.nlargest(limit, (
+            (round(scale * sum(
+                weights[ingredient]
+                for ingredient in own & self.ingredients[other])
+                / norms[other] + tag_scores[tags[other]], 6), other)
+            for _, other in best))
+
+
+def group(pairs):
+    grouped = defaultdict(set)
+    for key, value in pairs:
+        grouped[key].add(value)
+    return grouped
+
+
+def load_index():
+    ingredients = group(AmountIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id').iterator())
+    tags = group(Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id').iterator())
+    frequency = Counter(
+        ingredient for recipe_ingredients in ingredients.values()
+        for ingredient in recipe_ingredients)
+    return SimilarityIndex(ingredients, tags, len(ingredients), frequency)
+
+
+def rebuild():
+    """Пересчитывает соседей всех рецептов. Возвращает число строк."""
+    index = load_index()
+    rows = [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+        for recipe_id in index.ingredients
+        for score, other in index.neighbours(recipe_id)]
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRecipe.objects.bulk_create(
+            rows, batch_size=c.FoodContant.LOAD_BATCH_SIZE)
+    return len(rows)
+
+
+def ingredient_frequency(ingredient_ids):
+    return Counter(dict(
+        AmountIngredient.objects.filter(ingredient__in=ingredient_ids)
+        .values('ingredient').annotate(total=Count('id'))
+        .values_list('ingredient', 'total')))
+
+
+def load_local_index(recipe_id):
+    """Индекс только по рецептам, у которых есть общие редкие
+    ингредиенты с `recipe_id`; частоты берутся по всей базе."""
+    own = set(AmountIngredient.objects.filter(
+        recipe=recipe_id).values_list('ingredient_id', flat=True))
+    total = Recipe.objects.count()
+    frequency = ingredient_frequency(own)
+    limit = max(1, MAX_DOCUMENT_FREQUENCY * total)
+    rare = {ingredient for ingredient in own
+            if frequency[ingredient] <= limit}
+    if not rare and own:
+        rare = {min(own, key=frequency.__getitem__)}
+    candidates = AmountIngredient.objects.filter(
+        ingredient__in=rare).values('recipe_id')
+    ingredients = group(
+        AmountIngredient.objects.filter(recipe__in=candidates)
+        .values_list('recipe_id', 'ingredient_id').iterator())
+    ingredients[recipe_id] = own
+    tags = group(Recipe.tags.through.objects.filter(
+        recipe__in=ingredients).values_list('recipe_id', 'tag_id'))
+    frequency.update(ingredient_frequency(
+        {ingredient for recipe_ingredients in ingredients.values()
+         for ingredient in recipe_ingredients} - own))
+    return SimilarityIndex(ingredients, tags, total, frequency)
+
+
+@transaction.atomic
+def refresh(recipe_id):
+    """Обновляет соседей рецепта после изменения его ингредиентов.
+
+    Оценка симметрична, поэтому рецепт заодно входит в списки соседей
+    других рецептов, если обходит их худшего соседа. Лишние строки
+    сверх top-K не мешают чтению и убираются при полной пересборке.
+    """
+    index = load_local_index(recipe_id)
+    scores = {other: score for score, other
+              in index.neighbours(recipe_id, limit=len(index.ingredients))}
+    limit = c.FoodContant.SIMILAR_RECIPES_LIMIT
+    SimilarRecipe.objects.filter(recipe=recipe_id).delete()
+    SimilarRecipe.objects.filter(similar=recipe_id).delete()
+    lowest = {
+        other: (total, worst) for other, total, worst in
+        SimilarRecipe.objects.filter(recipe__in=scores)
+        .values('recipe').annotate(total=Count('id'), worst=Min('score'))
+        .values_list('recipe', 'total', 'worst')}
+    top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    rows = [SimilarRecipe(recipe_id=recipe_id, similar_id=other,
+                          score=score) for other, score in top]
+    rows.extend(
+        SimilarRecipe(recipe_id=other, similar_id=recipe_id, score=score)
+        for other, score in scores.items()
+        if lowest.get(other, (0, 0))[0] < limit
+        or score > lowest[other][1])
+    SimilarRecipe.objects.bulk_create(
+        rows, batch_size=c.FoodContant.LOAD_BATCH_SIZE)
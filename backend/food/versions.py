@@ -0,0 +1,41 @@
+import time
+import uuid
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def profile_scope(user_id):
+    """Публичные данные пользователя: имя, логин, почта."""
+    return f'profile:{user_id}'
+
+
+def new_version():
+    return uuid.uuid4().hex[:16], int(time.time())
+
+
+def get_versions(*scopes):
+    """Возвращает пары (метка, время изменения) для областей данных.
+
+    Если метки нет в кэше (первое обращение или вытеснение), создаётся
+    новая: клиенты просто получат данные заново.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    for key, version in missing.items():
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    version = new_version()
+    cache.set_many(
+        {VERSION_KEY.format(scope): version for scope in scopes}, None)
@@ -1,7 +1,25 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
 
-application = get_asgi_application()
+ASGI_URLCONF = 'foodgram_backend.asgi_urls'
+
+
+class FoodgramASGIHandler(ASGIHandler):
+    """Запросы под ASGI разбираются по маршрутам с асинхронными обёртками.
+
+    Под WSGI остаются обычные маршруты из ROOT_URLCONF.
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = FoodgramASGIHandler()
@@ -0,0 +1,4 @@
+"""Маршруты для ASGI: тяжёлые GET-запросы API идут через пул потоков."""
+from .urls import get_urlpatterns
+
+urlpatterns = get_urlpatterns('api.asgi_urls')
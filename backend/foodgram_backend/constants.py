@@ -5,6 +5,7 @@ class UserContant(IntEnum):
     MAX_USER_EMAIL_LENGTH = 30
     MAX_USERNAME_LENGTH = 40
     MAX_USER_NAME_LENGTH = 50
+    AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
 
 
 class FoodContant(IntEnum):
@@ -16,3 +17,11 @@ class FoodContant(IntEnum):
     MAX_COOKING_TIME = 10000
     MAX_INGREDIENT_NAME = 200
     PAGE_SIZE = 6
+    INGREDIENT_SEARCH_LIMIT = 50
+    SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+    LOAD_BATCH_SIZE = 1000
+    REFERENCE_CACHE_TIMEOUT = 24 * 60 * 60
+    MAX_BATCH_RECIPES = 100
+    FEED_BACKFILL_LIMIT = 100
+    SIMILAR_RECIPES_LIMIT = 10
+    MAX_PANTRY_INGREDIENTS = 200
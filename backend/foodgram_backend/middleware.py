@@ -0,0 +1,32 @@
+import asyncio
+
+
+class AsyncCapableMiddleware:
+    """Основа middleware, которое под ASGI работает прямо на цикле событий.
+
+    Синхронное middleware Django 3.2 выполняет в одном общем потоке
+    вместе со всей обработкой запроса ниже по цепочке, и параллельные
+    запросы ждут друг друга. Наследники описывают синхронную обработку
+    в `handle`, асинхронную — в `__acall__`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так обработчик запросов узнаёт, что вызов вернёт корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
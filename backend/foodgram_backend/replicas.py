@@ -0,0 +1,99 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .middleware import AsyncCapableMiddleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'db_primary:{}'
+# Токены читаются только с основной базы: токен, выданный при входе,
+# может ещё не дойти до реплики к следующему запросу клиента.
+PRIMARY_APPS = ('authtoken',)
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES
+            if alias != DEFAULT_DB_ALIAS]
+
+
+@contextmanager
+def primary():
+    """Читать внутри блока с основной базы.
+
+    Нужно для данных, которые кладутся в кэш под новой версией:
+    отставшая реплика закэшировала бы старое состояние надолго.
+    """
+    token = use_replica.set(False)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+def pin_key(request):
+    """Ключ клиента: по токену, а для анонимных запросов по адресу."""
+    client = (request.META.get('HTTP_AUTHORIZATION')
+              or request.META.get('REMOTE_ADDR', ''))
+    return PIN_KEY.format(hashlib.sha256(client.encode()).hexdigest())
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """Отправляет чтение безопасных запросов на реплики.
+
+    После успешного изменяющего запроса клиент на
+    REPLICA_STICKY_SECONDS закрепляется за основной базой.
+    Подключается в settings, только если реплики настроены.
+    """
+
+    def handle(self, request):
+        key = pin_key(request)
+        is_safe = request.method in SAFE_METHODS
+        token = use_replica.set(is_safe and not cache.get(key))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not is_safe and response.status_code < 400:
+            cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        key = pin_key(request)
+        is_safe = request.method in SAFE_METHODS
+        pinned = is_safe and await sync_to_async(
+            cache.get, thread_sensitive=False)(key)
+        token = use_replica.set(is_safe and not pinned)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not is_safe and response.status_code < 400:
+            await sync_to_async(cache.set, thread_sensitive=False)(
+                key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not use_replica.get()
+                or model._meta.app_label in PRIMARY_APPS):
+            return DEFAULT_DB_ALIAS
+        replicas = get_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -47,7 +47,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -62,6 +62,7 @@ DJOSER = {
 }
 
 MIDDLEWARE = [
+    'foodgram_backend.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,8 +98,11 @@ if DEBUG:
     DATABASES = {'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': str(os.path.join(BASE_DIR, "db.sqlite3")),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
     }
     }
+    # Копия базы, которая изображает реплику при локальной проверке.
+    replica_names = os.getenv('SQLITE_REPLICAS', '')
 
 else:
     DATABASES = {'default': {
@@ -107,9 +111,63 @@ else:
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
     }
     }
+    # Хосты реплик через запятую, например replica1:5432,replica2.
+    replica_names = os.getenv('DB_REPLICAS', '')
+
+for number, replica in enumerate(filter(None, replica_names.split(',')), 1):
+    location = ({'NAME': replica} if DEBUG
+                else dict(zip(('HOST', 'PORT'), replica.split(':'))))
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        **location,
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_REPLICA_CONN_MAX_AGE', DATABASES['default']['CONN_MAX_AGE'])),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram_backend.replicas.ReplicaRouter']
+
+# Без реплик middleware только добавляло бы шаг к каждому запросу.
+if len(DATABASES) > 1:
+    MIDDLEWARE.append('foodgram_backend.replicas.ReplicaMiddleware')
+
+# Сколько секунд после изменения данных читать их запросами этого
+# клиента с основной базы, чтобы не увидеть отставшую реплику.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# При нескольких процессах нужен общий кэш (memcached, база данных):
+# через него процессы узнают об изменении данных.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Сколько секунд хранить число рецептов для набора фильтров и с какого
+# размера выборки на PostgreSQL брать оценку планировщика вместо COUNT(*).
+RECIPE_COUNT_CACHE_TIMEOUT = int(os.getenv('RECIPE_COUNT_CACHE_TIMEOUT', 60))
+RECIPE_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('RECIPE_COUNT_ESTIMATE_THRESHOLD', 10000))
+
+# Заголовок Server-Timing и строки лога foodgram.timing для каждого запроса.
+SERVER_TIMING = os.getenv('SERVER_TIMING', default='False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
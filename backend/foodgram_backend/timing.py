@@ -0,0 +1,163 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger('foodgram.timing')
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db', 'serialize')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db += time.perf_counter() - started
+
+
+def add_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializer:
+    """Сериализатор, у которого чтение .data засекается.
+
+    Остальные атрибуты берутся у обёрнутого сериализатора. Вложенные
+    сериализаторы вызываются через to_representation и попадают в это
+    же время.
+    """
+
+    def __init__(self, serializer, stats):
+        self.serializer = serializer
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+    def __iter__(self):
+        return iter(self.serializer)
+
+    def __getitem__(self, key):
+        return self.serializer[key]
+
+    @property
+    def data(self):
+        started = time.perf_counter()
+        try:
+            return self.serializer.data
+        finally:
+            self.stats.serialize += time.perf_counter() - started
+
+
+class ServerTimingMixin:
+    """Время сериализации ответа для ServerTimingMiddleware.
+
+    Сериализаторы из get_serializer засекаются сами, созданные
+    в представлении напрямую — после обёртки timed_serializer.
+    Без SERVER_TIMING сериализаторы не оборачиваются.
+    """
+
+    def timed_serializer(self, serializer):
+        stats = current_stats.get()
+        if stats is None:
+            return serializer
+        return TimedSerializer(serializer, stats)
+
+    def get_serializer(self, *args, **kwargs):
+        return self.timed_serializer(
+            super().get_serializer(*args, **kwargs))
+
+
+def view_name(request):
+    match = request.resolver_match
+    view_func = match.func if match else None
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+    method = request.method.lower()
+    action = getattr(view_func, 'actions', {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """Считает запросы к базе, время базы, сериализации и представления.
+
+    Включается настройкой SERVER_TIMING. Сериализацию засекают
+    представления с ServerTimingMixin. Результат и размер ответа
+    отдаются в заголовке Server-Timing и пишутся в лог foodgram.timing
+    с именем представления вида RecipeViewSet.list.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        connection_created.connect(add_query_recorder)
+        for connection in connections.all():
+            add_query_recorder(connection)
+
+    def handle(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.report(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.report(request, response, stats, started)
+
+    def report(self, request, response, stats, started):
+        total = (time.perf_counter() - started) * 1000
+        db, serialize = stats.db * 1000, stats.serialize * 1000
+        size = (None if response.streaming
+                else len(response.content))
+        metrics = [
+            f'db;dur={db:.1f};desc="{stats.queries} queries"',
+            f'serialize;dur={serialize:.1f}',
+            f'view;dur={total - serialize:.1f}',
+            f'total;dur={total:.1f}',
+        ]
+        if size is not None:
+            metrics.append(f'size;desc="{size} bytes"')
+        response['Server-Timing'] = ', '.join(metrics)
+        name = view_name(request)
+        logger.info(
+            'view=%s method=%s status=%s queries=%d db_ms=%.1f '
+            'serialize_ms=%.1f view_ms=%.1f total_ms=%.1f size=%s',
+            name, request.method, response.status_code, stats.queries,
+            db, serialize, total - serialize, total, size,
+            extra={'view': name, 'queries': stats.queries, 'db_ms': db,
+                   'serialize_ms': serialize, 'total_ms': total,
+                   'size': size})
+        return response
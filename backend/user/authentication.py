@@ -0,0 +1,46 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram_backend import constants as c
+
+from .models import User
+
+TOKEN_KEY = 'auth_token:{}'
+
+
+def token_cache_key(key):
+    """Ключ кэша без самого токена: в кэше он не должен быть виден."""
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_tokens(keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая хранит в кэше только id пользователя.
+
+    Остальные поля пользователя отложены и загружаются при обращении.
+    Записи сбрасываются сигналами при удалении токена, смене пароля,
+    блокировке и удалении пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user_id = cache.get(cache_key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user.id,
+                      c.UserContant.AUTH_TOKEN_CACHE_TIMEOUT)
+            return user, token
+        # В кэш попадают только активные пользователи.
+        user = User.from_db(router.db_for_write(User), ['id', 'is_active'],
+                            [user_id, True])
+        token = Token.from_db(router.db_for_write(Token), ['key', 'user_id'],
+                              [key, user_id])
+        token.user = user
+        return user, token
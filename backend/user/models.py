@@ -28,6 +28,8 @@ class User(AbstractUser):
         max_length=c.UserContant.MAX_USER_NAME_LENGTH,
         verbose_name='фамилия'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество рецептов')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
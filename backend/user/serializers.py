@@ -18,6 +18,8 @@ class UserReadSerializer(serializers.ModelSerializer):
             "is_subscribed")
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context['request']
         if request and not request.user.is_anonymous:
             return Subscribe.objects.filter(user=request.user,
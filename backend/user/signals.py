@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+from .models import User
+
+# Поля, от которых зависит доступ по токену.
+CREDENTIAL_FIELDS = {'password', 'is_active'}
+
+
+@receiver(post_delete, sender=Token)
+def reset_token(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_tokens([instance.key]))
+
+
+@receiver(post_save, sender=User)
+def reset_user_tokens(sender, instance, created, update_fields, **kwargs):
+    # Вход в систему сохраняет только last_login: токены не трогаем.
+    if created or (update_fields is not None
+                   and not CREDENTIAL_FIELDS & update_fields):
+        return
+    keys = list(Token.objects.filter(user=instance)
+                .values_list('key', flat=True))
+    transaction.on_commit(lambda: invalidate_tokens(keys))